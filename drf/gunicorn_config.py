@@ -0,0 +1,50 @@
+"""
+Gunicorn config for the production server.
+
+    gunicorn -c drf/gunicorn_config.py
+
+SERVER_MODE="wsgi" (default) serves drf.wsgi with threaded workers, SERVER_MODE="asgi"
+serves drf.asgi (including the /api/async/ endpoints) with uvicorn workers.
+
+The app is preloaded in the master, so workers fork with Django already imported.
+"kill -HUP <master pid>" replaces the workers gracefully, but a preloaded app keeps
+the old code; to deploy new code send USR2 (starts a new master) and then QUIT to
+the old master.
+"""
+
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+
+wsgi_app = "drf.asgi:application" if SERVER_MODE == "asgi" else "drf.wsgi:application"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# workers: processes, threads: requests in flight per WSGI worker
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+if SERVER_MODE == "asgi":
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+# seconds an idle keep-alive connection is kept open, behind a load balancer it
+# should be longer than the balancer's idle timeout
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# recycle workers now and then, jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    """Drops the database connections the preloaded master may have opened."""
+    from django.db import connections
+
+    connections.close_all()
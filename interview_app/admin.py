@@ -10,3 +10,4 @@ admin.site.register(Shipment)
 admin.site.register(Payment)
 admin.site.register(Status)
 admin.site.register(EmployeeManagesShipment)
+admin.site.register(LoadCheckpoint)
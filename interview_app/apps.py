@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class InterviewAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'interview_app'
+
+    def ready(self):
+        # invalidates the cached responses when the models change
+        from .cache import connect_signals
+
+        connect_signals()
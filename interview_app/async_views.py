@@ -0,0 +1,158 @@
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.mixins import ListModelMixin
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.throttling import UserRateThrottle
+from .cache import (
+    aget_entry,
+    aresponse_key,
+    aset_entry,
+    get_timeout,
+)
+from .middleware import authenticate
+from .renderers import FastJSONRenderer
+
+
+async def allow_request(request):
+    """
+    Runs the UserRateThrottle of the sync views, with the same cache key and request
+    history, so a user has one REQUEST_PER_MIN limit across the sync and async
+    endpoints.
+    """
+    throttle = UserRateThrottle()
+    if throttle.rate is None:
+        return True
+    return await sync_to_async(throttle.allow_request)(request, None)
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """Renders data like the DRF JSON responses of the sync views."""
+    return HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+    )
+
+
+class AsyncReadView(View):
+    """
+    Async GET endpoint for a DRF generic view of views.py. The queryset, filters,
+    serializer, pagination and cache dependencies come from view_class, the database
+    and Redis are read with the async ORM and redis.asyncio, so a worker does not
+    block a thread per request.
+    """
+
+    view_class = None
+
+    async def get(self, request, *args, **kwargs):
+        if hasattr(request, "oauth2_credentials"):
+            # already looked up by OAuth2TokenMiddleware
+            credentials = request.oauth2_credentials
+        else:
+            credentials = await authenticate(request)
+        if credentials is None:
+            return render(
+                {"detail": "Authentication credentials were not provided."},
+                status.HTTP_401_UNAUTHORIZED,
+            )
+        drf_request = Request(request)
+        drf_request.user, drf_request.auth = credentials
+        if not await allow_request(drf_request):
+            return render(
+                {"detail": "Request was throttled."},
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+
+        view = self.view_class(
+            request=drf_request, args=args, kwargs=kwargs, format_kwarg=None
+        )
+        for permission in view.get_permissions():
+            if not permission.has_permission(drf_request, view):
+                return render(
+                    {"detail": "You do not have permission to perform this action."},
+                    status.HTTP_403_FORBIDDEN,
+                )
+
+        key, generations = await aresponse_key(view, drf_request, kwargs)
+        cached = await aget_entry(key)
+        if cached is not None:
+            status_code, content, headers, expires_at, delta = cached
+            response = HttpResponse(content, status=status_code)
+            for name, value in headers:
+                response[name] = value
+            response["X-Cache"] = "HIT"
+            return response
+
+        started = time.monotonic()
+        queryset = view.filter_queryset(view.get_queryset())
+        if issubclass(self.view_class, ListModelMixin):
+            response = await self.list(view, queryset)
+        else:
+            response = await self.retrieve(view, queryset, kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            timeout = get_timeout(settings.CACHE_TTL_SECONDS, generations)
+            entry = (
+                response.status_code,
+                response.content,
+                list(response.items()),
+                time.time() + timeout,
+                time.monotonic() - started,
+            )
+            await aset_entry(key, entry, timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    async def list(self, view, queryset):
+        pagination = view.paginator
+        if pagination is None:
+            objects = [obj async for obj in queryset]
+            return render(view.get_serializer(objects, many=True).data)
+        if not isinstance(pagination, PageNumberPagination):
+            # keyset pagination has no async version, it runs in a thread
+            page = await sync_to_async(pagination.paginate_queryset)(
+                queryset, view.request, view
+            )
+            data = view.get_serializer(page, many=True).data
+            return render(pagination.get_paginated_response(data).data)
+
+        pagination.request = view.request
+        page_size = pagination.get_page_size(view.request)
+        paginator = pagination.django_paginator_class(queryset, page_size)
+        if type(paginator) is DjangoPaginator:
+            paginator.count = await queryset.acount()
+        else:
+            # custom counts (e.g. the planner estimate) have no async version
+            await sync_to_async(lambda: paginator.count)()
+        page_number = pagination.get_page_number(view.request, paginator)
+        try:
+            pagination.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            message = pagination.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            return render({"detail": message}, status.HTTP_404_NOT_FOUND)
+        objects = [obj async for obj in pagination.page.object_list]
+        data = view.get_serializer(objects, many=True).data
+        return render(pagination.get_paginated_response(data).data)
+
+    async def retrieve(self, view, queryset, kwargs):
+        # the only url kwarg is the lookup, "pk" or "rec_id"
+        ((lookup, value),) = kwargs.items()
+        try:
+            obj = await queryset.filter(**{lookup: value}).afirst()
+        except (ValueError, ValidationError):
+            obj = None
+        if obj is None:
+            model = queryset.model._meta.object_name
+            return render(
+                {"detail": f"No {model} matches the given query."},
+                status.HTTP_404_NOT_FOUND,
+            )
+        return render(view.get_serializer(obj).data)
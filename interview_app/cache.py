@@ -0,0 +1,599 @@
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+import zlib
+import msgpack
+import redis.asyncio
+from collections import Counter, OrderedDict
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django_redis import get_redis_connection
+from .models import (
+    Employee,
+    Membership,
+    Customer,
+    Shipment,
+    Payment,
+    Status,
+    EmployeeManagesShipment,
+)
+from .routers import reads_from_replica
+from .serializers import get_serializer_models
+
+logger = logging.getLogger(__name__)
+
+# Models whose changes invalidate the cached responses
+CACHED_MODELS = (
+    Employee,
+    Membership,
+    Customer,
+    Shipment,
+    Payment,
+    Status,
+    EmployeeManagesShipment,
+)
+
+
+# region Local Tier
+class LocalCache:
+    """
+    Size bounded, in-process LRU cache with a TTL per entry. Every worker has its own
+    copy, so entries live only a few seconds and the generations invalidated by
+    another process are dropped through Redis pub/sub.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        ttl = self.ttl if timeout is None else min(self.ttl, timeout)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache(
+    settings.CACHE_LOCAL_MAX_ENTRIES, settings.CACHE_LOCAL_TTL_SECONDS
+)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+subscriber = None
+subscriber_lock = threading.Lock()
+
+
+def on_invalidation(message):
+    local_cache.delete(message["data"].decode())
+
+
+def on_subscriber_error(error, pubsub, thread):
+    # messages may have been lost while disconnected
+    logger.warning(f"Cache invalidation channel error: {error}")
+    local_cache.clear()
+    time.sleep(1)
+
+
+def subscribe():
+    """
+    Starts the thread dropping the local copies of the generations invalidated by other
+    processes, once per process (threads do not survive a fork). A lost message
+    delays the invalidation by at most the local TTL.
+    """
+    global subscriber
+    if subscriber is not None and subscriber.is_alive():
+        return
+    with subscriber_lock:
+        if subscriber is not None and subscriber.is_alive():
+            return
+        pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: on_invalidation})
+        subscriber = pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=on_subscriber_error
+        )
+
+
+# endregion
+
+
+# region Generations
+def generation_key(model, pk=None):
+    """Returns the cache key of the generation of a model or of a single object."""
+    label = model._meta.label_lower
+    return f"generation:{label}" if pk is None else f"generation:{label}:{pk}"
+
+
+def get_generations(keys, local=False):
+    """
+    Returns the current generation of each key. A missing generation (never
+    invalidated, evicted or cleared) starts from the current time, so it can not
+    match the generation of a response cached before it was lost.
+    With local=True the generations are read from the local tier first.
+    """
+    generations = {}
+    if local:
+        subscribe()
+        for key in keys:
+            generation = local_cache.get(key)
+            if generation is not None:
+                generations[key] = generation
+
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        found = cache.get_many(missing)
+        for key in missing:
+            if key not in found:
+                cache.add(key, time.time_ns(), timeout=None)
+                found[key] = cache.get(key)
+            if local:
+                local_cache.set(key, found[key])
+        generations.update(found)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(key):
+    # the generation is the time of the last change
+    cache.set(key, time.time_ns(), timeout=None)
+    if local_cache.enabled:
+        local_cache.delete(key)
+        get_redis_connection("default").publish(INVALIDATION_CHANNEL, key)
+
+
+def invalidate(model, pk=None):
+    """
+    Invalidates the cached responses of a model, and of a single object if pk is given.
+    The old responses are not deleted, their keys are never built again and they
+    expire with their TTL.
+    """
+    bump_generation(generation_key(model))
+    if pk is not None:
+        bump_generation(generation_key(model, pk))
+
+
+def invalidate_instance(sender, instance, **kwargs):
+    """
+    post_save/post_delete receiver. Invalidates now and again after the commit, so a
+    response built from the old rows before the commit is not served either.
+    """
+    invalidate(sender, instance.pk)
+    transaction.on_commit(lambda: invalidate(sender, instance.pk))
+
+
+def connect_signals():
+    for model in CACHED_MODELS:
+        uid = f"cache:{model._meta.label_lower}"
+        post_save.connect(invalidate_instance, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_instance, sender=model, dispatch_uid=uid)
+
+
+# endregion
+
+
+# region Metrics
+METRICS_KEY = "cache_metrics"
+METRICS_FLUSH_SECONDS = 1
+METRICS_EVENTS = ("hit", "local_hit", "miss", "raw_bytes", "stored_bytes")
+pending_metrics = Counter()
+metrics_lock = threading.Lock()
+metrics_flushed_at = 0.0
+
+
+def record(view_name, event, count=1):
+    """
+    Counts a cache hit, local hit or miss (or the bytes stored) of the view. The
+    counts are sent to Redis at most once a second, so a local hit does not leave
+    the worker.
+    """
+    global metrics_flushed_at
+    with metrics_lock:
+        pending_metrics[f"{view_name}:{event}"] += count
+        if time.monotonic() - metrics_flushed_at < METRICS_FLUSH_SECONDS:
+            return
+        metrics_flushed_at = time.monotonic()
+    flush_metrics()
+
+
+def flush_metrics():
+    with metrics_lock:
+        counts = dict(pending_metrics)
+        pending_metrics.clear()
+    if counts:
+        pipeline = get_redis_connection("default").pipeline()
+        for field, count in counts.items():
+            pipeline.hincrby(METRICS_KEY, field, count)
+        pipeline.execute()
+
+
+def get_metrics():
+    """Returns {view name: {event: count}} for the METRICS_EVENTS."""
+    flush_metrics()
+    metrics = {}
+    counters = get_redis_connection("default").hgetall(METRICS_KEY)
+    for field, count in counters.items():
+        view_name, event = field.decode().rsplit(":", 1)
+        metrics.setdefault(view_name, dict.fromkeys(METRICS_EVENTS, 0))[event] = int(
+            count
+        )
+    return metrics
+
+
+def reset_metrics():
+    with metrics_lock:
+        pending_metrics.clear()
+    get_redis_connection("default").delete(METRICS_KEY)
+
+
+# endregion
+
+
+# region Payloads
+def encode_entry(entry):
+    """
+    Packs a cached response with msgpack, the body is compressed with zlib when it is
+    at least CACHE_COMPRESS_MIN_BYTES long and compression makes it smaller.
+    """
+    status_code, content, headers, expires_at, delta = entry
+    body, compressed = content, False
+    if len(content) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(content, settings.CACHE_COMPRESS_LEVEL)
+        if len(packed) < len(content):
+            body, compressed = packed, True
+    return msgpack.packb([status_code, body, headers, expires_at, delta, compressed])
+
+
+def decode_entry(payload):
+    status_code, body, headers, expires_at, delta, compressed = msgpack.unpackb(payload)
+    content = zlib.decompress(body) if compressed else body
+    return status_code, content, headers, expires_at, delta
+
+
+def get_entry(key):
+    payload = cache.get(key)
+    return None if payload is None else decode_entry(payload)
+
+
+def set_entry(key, entry, timeout):
+    """Stores the response in Redis, returns the size of the stored payload."""
+    payload = encode_entry(entry)
+    cache.set(key, payload, timeout)
+    return len(payload)
+
+
+# endregion
+
+
+# region Stampede Protection
+EARLY_REFRESH_BETA = 1.0
+LOCK_POLL_SECONDS = 0.05
+
+
+def should_refresh(expires_at, delta):
+    """
+    Probabilistic early refresh (XFetch): the closer the entry is to its expiry and
+    the longer it took to build, the more likely a request rebuilds it before it
+    expires, so the requests of a popular page do not all miss at the same moment.
+    """
+    # -log(u) is exponentially distributed, 1 - random() avoids log(0)
+    gap = -delta * EARLY_REFRESH_BETA * math.log(1.0 - random.random())
+    return time.time() + gap >= expires_at
+
+
+# deletes the lock only if it still holds the token of the caller
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def lock_key(key):
+    return cache.make_key(f"lock:{key}")
+
+
+def acquire_lock(key):
+    """
+    Returns a token if this request is the one that builds the response of key, None
+    if another request holds the lock.
+    """
+    token = uuid.uuid4().hex
+    acquired = get_redis_connection("default").set(
+        lock_key(key), token, nx=True, ex=settings.CACHE_LOCK_SECONDS
+    )
+    return token if acquired else None
+
+
+def release_lock(key, token):
+    """
+    Releases the lock of key if token still holds it. After CACHE_LOCK_SECONDS the
+    lock may have expired and been taken by another request.
+    """
+    if token is not None:
+        get_redis_connection("default").eval(
+            RELEASE_LOCK_SCRIPT, 1, lock_key(key), token
+        )
+
+
+def wait_for_response(key):
+    """
+    Waits for the request holding the lock to store the response. Returns None as soon
+    as the lock is released without one (the view failed or its response is not
+    cached), or after CACHE_LOCK_SECONDS.
+    """
+    redis_connection = get_redis_connection("default")
+    deadline = time.monotonic() + settings.CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        cached = get_entry(key)
+        if cached is not None:
+            return cached
+        if not redis_connection.exists(lock_key(key)):
+            # it may have been stored right before the release
+            return get_entry(key)
+    return None
+
+
+# endregion
+
+
+# region Response Cache
+def get_dependencies(view, kwargs):
+    """
+    Returns the generation keys a response of the view depends on: the models of
+    the serializer tree and view.cache_models. A detail view depends on its own
+    object instead of its whole model.
+    """
+    serializer_class = view.get_serializer_class()
+    model = serializer_class.Meta.model
+    models = get_serializer_models(serializer_class) | set(
+        getattr(view, "cache_models", ())
+    )
+    pk = kwargs.get("pk", kwargs.get("rec_id"))
+    keys = sorted(
+        generation_key(dependency)
+        for dependency in models
+        if pk is None or dependency is not model
+    )
+    if pk is not None:
+        keys.append(generation_key(model, pk))
+    return keys
+
+
+def get_partition(view, request):
+    """
+    Returns what the response may depend on about the caller. The views do not filter
+    by user, so every token with the same scopes passing the same permission classes
+    shares the responses, and token rotation does not empty the cache.
+    """
+    permissions = sorted(
+        f"{type(permission).__module__}.{type(permission).__qualname__}"
+        for permission in view.get_permissions()
+    )
+    scopes = sorted(getattr(request.auth, "scope", "").split())
+    return f"{','.join(permissions)}:{' '.join(scopes)}"
+
+
+def response_key(view, request, kwargs, local=False):
+    """Returns the cache key of the response and the generations it depends on."""
+    keys = get_dependencies(view, kwargs)
+    generations = get_generations(keys, local)
+    return build_response_key(view, request, generations), generations
+
+
+def get_timeout(timeout, generations):
+    """
+    A response read from a replica right after a change may not include the change
+    yet, it is kept only until the replicas catch up.
+    """
+    if not generations or not reads_from_replica():
+        return timeout
+    changed = (time.time_ns() - max(generations)) / 1e9
+    if changed < settings.REPLICA_LAG_SECONDS:
+        return min(timeout, settings.REPLICA_LAG_SECONDS)
+    return timeout
+
+
+def build_response_key(view, request, generations):
+    generations = ":".join(str(generation) for generation in generations)
+    url = "{}:{}:{}".format(
+        request.get_full_path(),
+        request.META.get("HTTP_ACCEPT", ""),
+        get_partition(view, request),
+    )
+    return "response:{}:{}:{}".format(
+        type(view).__name__,
+        hashlib.md5(url.encode()).hexdigest(),
+        hashlib.md5(generations.encode()).hexdigest(),
+    )
+
+
+def cache_response(timeout, local=False):
+    """
+    Caches the responses of a view's get method for timeout seconds. get runs after
+    the authentication, permission and throttle checks, so a cached response is only
+    served to callers allowed to read it. Unlike cache_page, the key includes the
+    generations of the models the response is built from, so a change to any of them
+    serves a fresh response right away.
+    local=True also keeps the responses of a hot view in the in-process tier, when
+    CACHE_LOCAL_MAX_ENTRIES is set.
+
+    Only one request builds a missing response, the others wait for it. An expired
+    response is kept for CACHE_STALE_SECONDS more and served while one request
+    rebuilds it.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            view_name = type(self).__name__
+            use_local = local and local_cache.enabled
+            key, generations = response_key(self, request, kwargs, use_local)
+            cached = local_cache.get(key) if use_local else None
+            if cached is not None:
+                record(view_name, "local_hit")
+            else:
+                cached = get_entry(key)
+                if cached is not None:
+                    record(view_name, "hit")
+                    if use_local:
+                        local_cache.set(key, cached, timeout)
+
+            token = None
+            if cached is None:
+                token = acquire_lock(key)
+                if token is None:
+                    # another request is building it
+                    cached = wait_for_response(key)
+                    if cached is not None:
+                        record(view_name, "hit")
+                    else:
+                        # it failed or timed out, build it here
+                        token = acquire_lock(key)
+            else:
+                expires_at, delta = cached[3], cached[4]
+                if should_refresh(expires_at, delta):
+                    token = acquire_lock(key)
+                    if token is not None:
+                        cached = None  # this request rebuilds it
+            if cached is not None:
+                status_code, content, headers, expires_at, delta = cached
+                response = HttpResponse(content, status=status_code)
+                for name, value in headers:
+                    response[name] = value
+                response["X-Cache"] = "HIT" if time.time() < expires_at else "STALE"
+                return response
+
+            record(view_name, "miss")
+            started = time.monotonic()
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except BaseException:
+                release_lock(key, token)
+                raise
+            response["X-Cache"] = "MISS"
+            if response.status_code != 200 or response.streaming:
+                release_lock(key, token)
+                return response
+
+            stored_timeout = get_timeout(timeout, generations)
+
+            def store(response):
+                cached = (
+                    response.status_code,
+                    response.content,
+                    list(response.items()),
+                    time.time() + stored_timeout,
+                    time.monotonic() - started,
+                )
+                stored = set_entry(
+                    key, cached, stored_timeout + settings.CACHE_STALE_SECONDS
+                )
+                record(view_name, "raw_bytes", len(response.content))
+                record(view_name, "stored_bytes", stored)
+                if use_local:
+                    local_cache.set(key, cached, stored_timeout)
+                release_lock(key, token)
+
+            # DRF responses are rendered after the view returns
+            if getattr(response, "is_rendered", True):
+                store(response)
+            else:
+                response.add_post_render_callback(store)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# endregion
+
+
+# region Async
+async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """
+    Returns the redis.asyncio client of the running event loop, a client can not be
+    shared between loops. Keys are built with cache.make_key, so both clients see the
+    same generations.
+    """
+    loop = asyncio.get_running_loop()
+    client = async_clients.get(loop)
+    if client is None:
+        client = async_clients[loop] = redis.asyncio.from_url(settings.REDIS_URL)
+    return client
+
+
+async def aget_generations(keys):
+    """Async version of get_generations, without the local tier."""
+    client = get_async_redis()
+    redis_keys = [cache.make_key(key) for key in keys]
+    generations = await client.mget(redis_keys) if redis_keys else []
+    for index, redis_key in enumerate(redis_keys):
+        if generations[index] is None:
+            await client.set(redis_key, time.time_ns(), nx=True)
+            generations[index] = await client.get(redis_key)
+    return [int(generation) for generation in generations]
+
+
+async def aresponse_key(view, request, kwargs):
+    keys = get_dependencies(view, kwargs)
+    generations = await aget_generations(keys)
+    return build_response_key(view, request, generations), generations
+
+
+async def aget_entry(key):
+    payload = await get_async_redis().get(cache.make_key(f"async:{key}"))
+    return None if payload is None else decode_entry(payload)
+
+
+async def aset_entry(key, entry, timeout):
+    """
+    Stores the response as a plain msgpack payload (django-redis would pickle it),
+    under its own key prefix so the sync views never read it.
+    """
+    await get_async_redis().set(
+        cache.make_key(f"async:{key}"), encode_entry(entry), ex=timeout
+    )
+
+
+# endregion
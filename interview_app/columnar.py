@@ -0,0 +1,109 @@
+import csv
+import gzip
+import io
+from itertools import islice
+from django.db import models, transaction
+from .models import Payment, Shipment, Status
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, gzip compressed csv is used without it
+    pyarrow = None
+
+# tables exported for analytics, by url/command name
+COLUMNAR_MODELS = {"shipments": Shipment, "payments": Payment, "statuses": Status}
+CONTENT_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "csv.gz": "application/gzip",
+}
+
+
+def get_formats():
+    """Returns the available formats, the first one is the default."""
+    return ["parquet", "csv.gz"] if pyarrow else ["csv.gz"]
+
+
+def get_arrow_type(field):
+    if isinstance(field, models.ForeignKey):
+        return get_arrow_type(field.target_field)
+    if isinstance(field, (models.BigIntegerField, models.BigAutoField)):
+        return pyarrow.int64()
+    if isinstance(field, models.IntegerField):
+        return pyarrow.int32()
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+class ChunkBuffer(io.RawIOBase):
+    """Write-only file collecting the bytes written since the last drain()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_table(queryset, file_format, chunk_size):
+    """
+    Yields the rows of queryset as Parquet (a row group per chunk) or gzip compressed
+    csv, chunk_size rows at a time. The columns are the model fields by attname, so
+    foreign keys are "C_ID_id" columns holding the rec_id of the related row, read with
+    values_list from a server-side cursor, so memory does not grow with the table.
+    """
+    fields = queryset.model._meta.concrete_fields
+    columns = [field.attname for field in fields]
+    buffer = ChunkBuffer()
+    # in a transaction the cursor is not WITH HOLD, see ExportView
+    with transaction.atomic(using=queryset.db):
+        rows = queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+        if file_format == "parquet":
+            schema = pyarrow.schema(
+                [
+                    pyarrow.field(column, get_arrow_type(field), field.null)
+                    for column, field in zip(columns, fields)
+                ]
+            )
+            with pyarrow.parquet.ParquetWriter(
+                buffer, schema, compression="zstd"
+            ) as writer:
+                while chunk := list(islice(rows, chunk_size)):
+                    writer.write_batch(
+                        pyarrow.record_batch(
+                            [
+                                pyarrow.array(values, type=column_type)
+                                for values, column_type in zip(
+                                    zip(*chunk), schema.types
+                                )
+                            ],
+                            schema=schema,
+                        )
+                    )
+                    yield buffer.drain()
+        else:
+            with gzip.GzipFile(fileobj=buffer, mode="wb") as file:
+                text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+                writer = csv.writer(text)
+                writer.writerow(columns)
+                while chunk := list(islice(rows, chunk_size)):
+                    writer.writerows(chunk)
+                    text.flush()
+                    yield buffer.drain()
+                text.detach()
+    yield buffer.drain()
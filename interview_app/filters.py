@@ -0,0 +1,41 @@
+from functools import reduce
+from operator import and_
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
+
+
+def prefix_query(term, config="simple"):
+    """
+    Returns a tsquery matching the words that start with term. The term is quoted, so
+    tsquery operators in user input (& | ! : ...) are plain text.
+    """
+    quoted = term.replace("\\", "\\\\").replace("'", "''")
+    return SearchQuery(f"'{quoted}':*", search_type="raw", config=config)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Ranked full text search for typeahead. Every term of ?search= must be a word prefix
+    in view.search_vector (served by its GIN expression index) or a substring of one of
+    view.search_fields (served by their trigram indexes). The results are ordered by
+    ts_rank, best match first, then by rec_id.
+    Views without a search_vector fall back to the SearchFilter behaviour.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_vector = getattr(view, "search_vector", None)
+        search_terms = self.get_search_terms(request)
+        if search_vector is None or not search_terms:
+            return super().filter_queryset(request, queryset, view)
+
+        search_fields = self.get_search_fields(view, request) or []
+        queryset = queryset.alias(search_document=search_vector)
+        queries = [prefix_query(term) for term in search_terms]
+        for term, query in zip(search_terms, queries):
+            condition = Q(search_document=query)
+            for field in search_fields:
+                condition |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(condition)
+        rank = SearchRank(F("search_document"), reduce(and_, queries))
+        return queryset.annotate(search_rank=rank).order_by("-search_rank", "rec_id")
@@ -0,0 +1,74 @@
+import copy
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from interview_app.models import Status
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the per-request latency of a status lookup (like /api/statuses/<pk>/) "
+        "with a new connection per request, persistent connections and the psycopg pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of requests per mode (default: 200)",
+        )
+
+    def handle(self, *args, **options):
+        modes = [
+            ("new connection per request", {"CONN_MAX_AGE": 0}),
+            ("persistent connections", {"CONN_MAX_AGE": 60}),
+        ]
+        if is_psycopg3:
+            modes.append(("connection pool", {"CONN_MAX_AGE": 0, "pool": True}))
+        else:
+            self.stdout.write("connection pool: skipped, requires psycopg 3")
+
+        status = Status.objects.order_by("pk").first()
+        pk = status.pk if status else 0
+        for name, config in modes:
+            latencies = self.benchmark(config, pk, options["requests"])
+            latencies.sort()
+            self.stdout.write(
+                f"{name}: {len(latencies)} requests, "
+                f"mean {statistics.mean(latencies):.2f} ms, "
+                f"p50 {latencies[len(latencies) // 2]:.2f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95)]:.2f} ms"
+            )
+
+    def benchmark(self, config, pk, requests):
+        """
+        Runs the lookup between the request_started/request_finished signals, which
+        close or keep the connection like a real request, on a copy of the default
+        database configured with config.
+        """
+        alias = "benchmark"
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict["CONN_MAX_AGE"] = config["CONN_MAX_AGE"]
+        settings_dict["OPTIONS"].pop("pool", None)
+        if config.get("pool"):
+            settings_dict["OPTIONS"]["pool"] = True
+        connections.settings[alias] = settings_dict
+        try:
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                Status.objects.using(alias).filter(pk=pk).first()
+                request_finished.send(sender=self.__class__)
+                latencies.append((time.perf_counter() - started) * 1000)
+            return latencies
+        finally:
+            connections[alias].close()
+            if config.get("pool"):
+                connections[alias].close_pool()
+            del connections[alias]
+            del connections.settings[alias]
@@ -0,0 +1,97 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from interview_app.models import Customer, Membership, Payment, Shipment
+from interview_app.renderers import FastJSONRenderer, orjson
+from interview_app.serializers import PaymentSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the render time of a page of payments (nested customer and shipment, "
+        "dates) with the stdlib JSONRenderer and FastJSONRenderer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-sizes",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000],
+            help="Page sizes to render (default: 10 100 1000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=100,
+            help="Renders per page size and renderer (default: 100)",
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed, FastJSONRenderer uses json")
+        renderers = [("json", JSONRenderer()), ("orjson", FastJSONRenderer())]
+        for page_size in options["page_sizes"]:
+            data = {
+                "count": page_size,
+                "next": None,
+                "previous": None,
+                "results": PaymentSerializer(self.payments(page_size), many=True).data,
+            }
+            timings = {}
+            for name, renderer in renderers:
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    content = renderer.render(data)
+                timings[name] = (time.perf_counter() - started) / options["repeat"]
+            self.stdout.write(
+                f"page size {page_size} ({len(content)} bytes): "
+                f"json {timings['json'] * 1000:.3f} ms, "
+                f"orjson {timings['orjson'] * 1000:.3f} ms "
+                f"({timings['json'] / timings['orjson']:.1f}x)"
+            )
+
+    @staticmethod
+    def payments(count):
+        """Unsaved payments with their related objects, the database is not used."""
+        membership = Membership(
+            rec_id=1, M_ID=1, Start_date=date(2024, 1, 1), End_date=date(2024, 12, 31)
+        )
+        payments = []
+        for i in range(count):
+            customer = Customer(
+                rec_id=i,
+                C_ID=i,
+                C_NAME=f"Müşteri {i}",
+                C_EMAIL_ID=f"customer{i}@example.com",
+                C_CONT_NO=9876543210,
+                C_ADDR="456 Avenue",
+                C_TYPE="Regular",
+                M_ID=membership,
+            )
+            shipment = Shipment(
+                rec_id=i,
+                SH_ID=i,
+                C_ID=customer,
+                SH_CONTENT="Test Content",
+                SH_DOMAIN="Domestic",
+                SER_TYPE="Express",
+                SH_WEIGHT="5kg",
+                SH_CHARGES=100 * i,
+                SR_ADDR="Source Address",
+                DS_ADDR="Destination Address",
+            )
+            payments.append(
+                Payment(
+                    rec_id=i,
+                    Payment_ID=f"payment-{i}",
+                    C_ID=customer,
+                    SH_ID=shipment,
+                    AMOUNT=1000,
+                    Payment_Status="PAID",
+                    Payment_Mode="CARD PAYMENT",
+                    Payment_Date=date(2024, 1, i % 28 + 1),
+                )
+            )
+        return payments
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from interview_app.cache import get_metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = "Prints the response cache hit/miss counts of each view"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after printing them",
+        )
+
+    def handle(self, *args, **options):
+        metrics = get_metrics()
+        if not metrics:
+            self.stdout.write("No cached requests yet.")
+        for view_name, counts in sorted(metrics.items()):
+            hits = counts["hit"] + counts["local_hit"]
+            total = hits + counts["miss"]
+            if not total:
+                continue
+            self.stdout.write(
+                f"{view_name}: {hits} hits ({counts['local_hit']} local), "
+                f"{counts['miss']} misses ({hits / total:.1%} hit rate)"
+            )
+            if counts["raw_bytes"]:
+                saved = counts["raw_bytes"] - counts["stored_bytes"]
+                self.stdout.write(
+                    f"  {counts['stored_bytes']} bytes stored for "
+                    f"{counts['raw_bytes']} bytes of responses "
+                    f"({saved} bytes, {saved / counts['raw_bytes']:.1%} saved)"
+                )
+        if options["reset"]:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS("Cache metrics reset."))
@@ -0,0 +1,62 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from interview_app.columnar import COLUMNAR_MODELS, get_formats, stream_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports Shipment, Payment and Status rows for analytics as Parquet (requires "
+        "pyarrow) or gzip compressed csv, e.g. ./export/shipments.parquet"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "tables",
+            nargs="*",
+            help=f"Tables to export: {', '.join(COLUMNAR_MODELS)} (default: all)",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["parquet", "csv.gz"],
+            default=get_formats()[0],
+            help=f"File format (default: {get_formats()[0]})",
+        )
+        parser.add_argument(
+            "--output-dir",
+            default="./export/",
+            help="Folder of the exported files (default: ./export/)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help=f"Rows per chunk (default: {settings.EXPORT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        tables = options["tables"] or list(COLUMNAR_MODELS)
+        for table in tables:
+            if table not in COLUMNAR_MODELS:
+                raise CommandError(
+                    f"Unknown table {table}, choose from {', '.join(COLUMNAR_MODELS)}"
+                )
+        file_format = options["format"]
+        if file_format not in get_formats():
+            raise CommandError(f"{file_format} requires pyarrow")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+        os.makedirs(options["output_dir"], exist_ok=True)
+
+        for table in tables:
+            queryset = COLUMNAR_MODELS[table].objects.all()
+            path = os.path.join(options["output_dir"], f"{table}.{file_format}")
+            started = time.perf_counter()
+            with open(path, "wb") as file:
+                for data in stream_table(queryset, file_format, options["chunk_size"]):
+                    file.write(data)
+            self.stdout.write(
+                f"{table}: {os.path.getsize(path)} bytes written to {path} "
+                f"in {time.perf_counter() - started:.2f} s"
+            )
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from interview_app.summaries import SUMMARY_MODELS, refresh_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the shipment and payment summaries (materialized views) behind "
+        "/api/analytics/, once or every --interval seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Refresh every INTERVAL seconds until interrupted (default: once)",
+        )
+        parser.add_argument(
+            "--blocking",
+            action="store_true",
+            help="Refresh without CONCURRENTLY, faster but blocks the readers",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        if interval is not None and interval <= 0:
+            raise CommandError("--interval must be a positive number.")
+        while True:
+            started = time.perf_counter()
+            refresh_summaries(concurrently=not options["blocking"])
+            self.stdout.write(
+                f"{', '.join(model.__name__ for model in SUMMARY_MODELS)} refreshed "
+                f"in {time.perf_counter() - started:.2f} s"
+            )
+            if interval is None:
+                return
+            time.sleep(max(0, interval - (time.perf_counter() - started)))
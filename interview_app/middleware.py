@@ -0,0 +1,64 @@
+import hashlib
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import patch_vary_headers
+from oauth2_provider import middleware
+from oauth2_provider.models import AccessToken
+
+
+async def authenticate(request):
+    """
+    Async version of OAuth2Authentication, returns the (user, access token) of a valid
+    bearer token or None. Like the oauth2_provider validator, the token is looked up
+    by its checksum.
+    """
+    keyword, _, token = request.headers.get("Authorization", "").partition(" ")
+    if keyword.lower() != "bearer" or not token:
+        return None
+    checksum = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    access_token = (
+        await AccessToken.objects.select_related("application", "user")
+        .filter(token_checksum=checksum)
+        .afirst()
+    )
+    if access_token is None or not access_token.is_valid():
+        return None
+    if access_token.user is None or not access_token.user.is_active:
+        return None
+    return access_token.user, access_token
+
+
+class OAuth2TokenMiddleware(middleware.OAuth2TokenMiddleware):
+    """
+    OAuth2TokenMiddleware that also runs natively under ASGI. The oauth2_provider one is
+    sync only, Django would run the whole middleware chain of every async request in
+    a thread for it. The async path looks the token up with the async ORM and keeps
+    the result in request.oauth2_credentials for AsyncReadView.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if request.headers.get("Authorization", "").startswith("Bearer"):
+            # AuthenticationMiddleware comes first, a session user is kept
+            user = await request.auser() if hasattr(request, "auser") else None
+            if user is None or user.is_anonymous:
+                request.oauth2_credentials = await authenticate(request)
+                if request.oauth2_credentials is not None:
+                    user = request.oauth2_credentials[0]
+                    request.user = request._cached_user = user
+                    request._acached_user = user
+
+        response = await self.get_response(request)
+        patch_vary_headers(response, ("Authorization",))
+        return response
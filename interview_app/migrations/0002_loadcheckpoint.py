@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interview_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LoadCheckpoint",
+            fields=[
+                (
+                    "rec_id",
+                    models.BigAutoField(
+                        editable=False,
+                        help_text="Record Id",
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        help_text="Csv File Path", max_length=500, unique=True
+                    ),
+                ),
+                ("file_size", models.BigIntegerField(help_text="Csv File Size")),
+                (
+                    "file_mtime",
+                    models.FloatField(help_text="Csv File Modification Time"),
+                ),
+                (
+                    "offset",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Byte Offset After The Last Committed Batch",
+                    ),
+                ),
+                (
+                    "rows",
+                    models.BigIntegerField(default=0, help_text="Committed Row Count"),
+                ),
+                (
+                    "completed",
+                    models.BooleanField(default=False, help_text="File Fully Loaded"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, help_text="Last Checkpoint"),
+                ),
+            ],
+        ),
+    ]
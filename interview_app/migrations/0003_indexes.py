@@ -0,0 +1,46 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:02
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the indexes are built without locking the tables against writes
+    atomic = False
+
+    dependencies = [
+        ("interview_app", "0002_loadcheckpoint"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="customer",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("C_NAME"), name="gin_trgm_ops"
+                ),
+                name="customer_name_trgm_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="shipment",
+            index=models.Index(
+                fields=["SH_CHARGES", "rec_id"], name="shipment_charges_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="status",
+            index=models.Index(fields=["Current_Status"], name="status_current_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="status",
+            index=models.Index(
+                condition=models.Q(("Current_Status", "DELIVERED")),
+                fields=["rec_id"],
+                name="status_delivered_idx",
+            ),
+        ),
+    ]
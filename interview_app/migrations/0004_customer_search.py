@@ -0,0 +1,50 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("interview_app", "0003_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="customer",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.CombinedSearchVector(
+                    django.contrib.postgres.search.CombinedSearchVector(
+                        django.contrib.postgres.search.SearchVector(
+                            "C_NAME", config="simple", weight="A"
+                        ),
+                        "||",
+                        django.contrib.postgres.search.SearchVector(
+                            "C_EMAIL_ID",
+                            django.db.models.functions.text.Replace(
+                                django.db.models.functions.text.Replace(
+                                    "C_EMAIL_ID", models.Value("@"), models.Value(" ")
+                                ),
+                                models.Value("."),
+                                models.Value(" "),
+                            ),
+                            config="simple",
+                            weight="B",
+                        ),
+                        django.contrib.postgres.search.SearchConfig("simple"),
+                    ),
+                    "||",
+                    django.contrib.postgres.search.SearchVector(
+                        "C_ADDR", config="simple", weight="C"
+                    ),
+                    django.contrib.postgres.search.SearchConfig("simple"),
+                ),
+                name="customer_search_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+# REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index on the view
+SHIPMENT_SUMMARY_SQL = """
+CREATE MATERIALIZED VIEW interview_app_shipment_summary AS
+SELECT
+    row_number() OVER (ORDER BY "SH_DOMAIN", "SER_TYPE") AS id,
+    "SH_DOMAIN",
+    "SER_TYPE",
+    count(*) AS shipment_count,
+    sum("SH_CHARGES") AS total_charges,
+    avg("SH_CHARGES")::double precision AS average_charges
+FROM interview_app_shipment
+GROUP BY "SH_DOMAIN", "SER_TYPE";
+CREATE UNIQUE INDEX shipment_summary_id_idx ON interview_app_shipment_summary (id);
+"""
+
+PAYMENT_SUMMARY_SQL = """
+CREATE MATERIALIZED VIEW interview_app_payment_summary AS
+SELECT
+    row_number() OVER (
+        ORDER BY month NULLS FIRST, "Payment_Mode", "Payment_Status"
+    ) AS id,
+    month,
+    "Payment_Mode",
+    "Payment_Status",
+    count(*) AS payment_count,
+    sum("AMOUNT") AS total_amount
+FROM (
+    SELECT *, date_trunc('month', "Payment_Date")::date AS month
+    FROM interview_app_payment
+) payment
+GROUP BY month, "Payment_Mode", "Payment_Status";
+CREATE UNIQUE INDEX payment_summary_id_idx ON interview_app_payment_summary (id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interview_app", "0004_customer_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        help_text="Row Number", primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "month",
+                    models.DateField(
+                        help_text="First Day Of The Payment Month (null: no date)",
+                        null=True,
+                    ),
+                ),
+                (
+                    "Payment_Mode",
+                    models.CharField(help_text="Payment Method", max_length=25),
+                ),
+                (
+                    "Payment_Status",
+                    models.CharField(help_text="Payment Status", max_length=10),
+                ),
+                (
+                    "payment_count",
+                    models.BigIntegerField(help_text="Number Of Payments"),
+                ),
+                (
+                    "total_amount",
+                    models.BigIntegerField(help_text="Total Payment Amount"),
+                ),
+            ],
+            options={
+                "db_table": "interview_app_payment_summary",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ShipmentSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        help_text="Row Number", primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "SH_DOMAIN",
+                    models.CharField(help_text="Shipment Domain", max_length=15),
+                ),
+                (
+                    "SER_TYPE",
+                    models.CharField(help_text="Shipment Service Type", max_length=15),
+                ),
+                (
+                    "shipment_count",
+                    models.BigIntegerField(help_text="Number Of Shipments"),
+                ),
+                (
+                    "total_charges",
+                    models.BigIntegerField(help_text="Total Shipment Charges"),
+                ),
+                (
+                    "average_charges",
+                    models.FloatField(help_text="Average Shipment Charges"),
+                ),
+            ],
+            options={
+                "db_table": "interview_app_shipment_summary",
+                "managed": False,
+            },
+        ),
+        migrations.RunSQL(
+            SHIPMENT_SUMMARY_SQL,
+            "DROP MATERIALIZED VIEW interview_app_shipment_summary;",
+        ),
+        migrations.RunSQL(
+            PAYMENT_SUMMARY_SQL,
+            "DROP MATERIALIZED VIEW interview_app_payment_summary;",
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:43
+
+from django.db import migrations
+
+# the row numbers change with each refresh, REFRESH MATERIALIZED VIEW CONCURRENTLY
+# matches the rows on the grouping columns instead
+SUMMARY_KEYS_SQL = """
+CREATE UNIQUE INDEX shipment_summary_group_idx
+ON interview_app_shipment_summary ("SH_DOMAIN", "SER_TYPE");
+DROP INDEX shipment_summary_id_idx;
+CREATE UNIQUE INDEX payment_summary_group_idx
+ON interview_app_payment_summary (month, "Payment_Mode", "Payment_Status");
+DROP INDEX payment_summary_id_idx;
+"""
+
+REVERSE_SUMMARY_KEYS_SQL = """
+CREATE UNIQUE INDEX shipment_summary_id_idx ON interview_app_shipment_summary (id);
+DROP INDEX shipment_summary_group_idx;
+CREATE UNIQUE INDEX payment_summary_id_idx ON interview_app_payment_summary (id);
+DROP INDEX payment_summary_group_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interview_app", "0005_summaries"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SUMMARY_KEYS_SQL, REVERSE_SUMMARY_KEYS_SQL),
+    ]
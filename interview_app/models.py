@@ -1,4 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Replace, Upper
 
 # Create your models here.
 
@@ -42,6 +46,20 @@ class Membership(models.Model):
         return f"Membership: {self.M_ID}"
 
 
+# the search document of a customer: name, email (whole and split into words) and
+# address, weighted in this order; "simple" keeps names and addresses unstemmed
+CUSTOMER_SEARCH_VECTOR = (
+    SearchVector("C_NAME", weight="A", config="simple")
+    + SearchVector(
+        "C_EMAIL_ID",
+        Replace(Replace("C_EMAIL_ID", Value("@"), Value(" ")), Value("."), Value(" ")),
+        weight="B",
+        config="simple",
+    )
+    + SearchVector("C_ADDR", weight="C", config="simple")
+)
+
+
 class Customer(models.Model):
     """
     Represents a customer in the system.
@@ -60,6 +78,17 @@ class Customer(models.Model):
         Membership, on_delete=models.CASCADE, help_text="Customer Membership Id"
     )
 
+    class Meta:
+        indexes = [
+            # SearchFilter runs UPPER("C_NAME") LIKE UPPER('%term%'), a trigram index
+            # serves the leading wildcard
+            GinIndex(
+                OpClass(Upper("C_NAME"), name="gin_trgm_ops"),
+                name="customer_name_trgm_idx",
+            ),
+            GinIndex(CUSTOMER_SEARCH_VECTOR, name="customer_search_idx"),
+        ]
+
     def __str__(self):
         return f"{self.C_NAME} ({self.C_TYPE})"
 
@@ -84,6 +113,12 @@ class Shipment(models.Model):
     SR_ADDR = models.CharField(max_length=100, help_text="Source Address")
     DS_ADDR = models.CharField(max_length=100, help_text="Destination Addres")
 
+    class Meta:
+        indexes = [
+            # ?ordering=SH_CHARGES and its keyset pagination (SH_CHARGES, rec_id)
+            models.Index(fields=["SH_CHARGES", "rec_id"], name="shipment_charges_idx"),
+        ]
+
     def __str__(self):
         return f"Shipment {self.SH_ID}"
 
@@ -128,6 +163,17 @@ class Status(models.Model):
     Sent_date = models.DateField(null=True, blank=True, help_text="Sent Date")
     Delivery_date = models.DateField(null=True, blank=True, help_text="Delivery Date")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["Current_Status"], name="status_current_idx"),
+            # the delivered shipments are the small, hot part of the table
+            models.Index(
+                fields=["rec_id"],
+                condition=Q(Current_Status="DELIVERED"),
+                name="status_delivered_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Status {self.SH_ID}"
 
@@ -152,3 +198,72 @@ class EmployeeManagesShipment(models.Model):
 
     def __str__(self):
         return f"Employee {self.Employee_E_ID} manages shipment {self.Shipment_Sh_ID}"
+
+
+class ShipmentSummary(models.Model):
+    """
+    Shipment count and charges per domain and service type. A materialized view
+    (migration 0005), refreshed by refresh_summaries.
+    """
+
+    # the ORM needs a primary key, a row number that changes with each refresh, the
+    # rows are identified by the grouping columns (unique index, migration 0006)
+    id = models.BigIntegerField(primary_key=True, help_text="Row Number")
+    SH_DOMAIN = models.CharField(max_length=15, help_text="Shipment Domain")
+    SER_TYPE = models.CharField(max_length=15, help_text="Shipment Service Type")
+    shipment_count = models.BigIntegerField(help_text="Number Of Shipments")
+    total_charges = models.BigIntegerField(help_text="Total Shipment Charges")
+    average_charges = models.FloatField(help_text="Average Shipment Charges")
+
+    class Meta:
+        managed = False
+        db_table = "interview_app_shipment_summary"
+
+    def __str__(self):
+        return f"{self.SH_DOMAIN} {self.SER_TYPE}: {self.shipment_count} shipments"
+
+
+class PaymentSummary(models.Model):
+    """
+    Payment count and amount per month, payment mode and payment status. A materialized
+    view (migration 0005), refreshed by refresh_summaries.
+    """
+
+    # see ShipmentSummary.id
+    id = models.BigIntegerField(primary_key=True, help_text="Row Number")
+    month = models.DateField(
+        null=True, help_text="First Day Of The Payment Month (null: no date)"
+    )
+    Payment_Mode = models.CharField(max_length=25, help_text="Payment Method")
+    Payment_Status = models.CharField(max_length=10, help_text="Payment Status")
+    payment_count = models.BigIntegerField(help_text="Number Of Payments")
+    total_amount = models.BigIntegerField(help_text="Total Payment Amount")
+
+    class Meta:
+        managed = False
+        db_table = "interview_app_payment_summary"
+
+    def __str__(self):
+        return f"{self.month} {self.Payment_Mode}: {self.payment_count} payments"
+
+
+class LoadCheckpoint(models.Model):
+    """
+    Represents the progress of a csv file loaded by the load_data command.
+    """
+
+    rec_id = models.BigAutoField(
+        primary_key=True, editable=False, help_text="Record Id"
+    )
+    path = models.CharField(max_length=500, unique=True, help_text="Csv File Path")
+    file_size = models.BigIntegerField(help_text="Csv File Size")
+    file_mtime = models.FloatField(help_text="Csv File Modification Time")
+    offset = models.BigIntegerField(
+        default=0, help_text="Byte Offset After The Last Committed Batch"
+    )
+    rows = models.BigIntegerField(default=0, help_text="Committed Row Count")
+    completed = models.BooleanField(default=False, help_text="File Fully Loaded")
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last Checkpoint")
+
+    def __str__(self):
+        return f"Checkpoint {self.path} ({self.rows} rows)"
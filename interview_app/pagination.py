@@ -0,0 +1,239 @@
+import base64
+import json
+from functools import cached_property
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_filter(ordering, key):
+    """
+    Returns a Q object matching the rows that come after key in the given ordering,
+    (a > x) OR (a = x AND b > y) ... for the ordering (a, b, ...).
+    """
+    after, equal = Q(), Q()
+    for field, value in zip(ordering, key):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        after |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return after
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination keyed on rec_id, or on the ordering of the
+    OrderingFilter plus rec_id (e.g. SH_CHARGES, rec_id). The cursor holds the key
+    of the last row of the page, so page N costs the same as page 1: no COUNT(*)
+    and no OFFSET scan.
+    """
+
+    ordering = "rec_id"
+    tiebreaker = "rec_id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_keyset_ordering(queryset)
+        self.key_fields = self.get_key_fields(queryset)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["reverse"]
+        ordering = self.ordering
+        if reverse:
+            # previous page: walk backwards from the first row of the current page
+            ordering = [self.flip(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(keyset_filter(ordering, cursor["key"]))
+        # one extra row tells if there is another page
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Returns the ordering of the queryset with rec_id appended as the tiebreaker.
+        The tiebreaker follows the direction of the last field, so a composite index
+        such as (SH_CHARGES, rec_id) can serve both directions.
+        """
+        ordering = [
+            field for field in queryset.query.order_by if isinstance(field, str)
+        ]
+        if not ordering:
+            return [self.ordering]
+        if self.tiebreaker not in [field.lstrip("-") for field in ordering]:
+            descending = ordering[-1].startswith("-")
+            ordering.append(f"-{self.tiebreaker}" if descending else self.tiebreaker)
+        return ordering
+
+    def get_key_fields(self, queryset):
+        """Returns the model fields (or annotation output fields) of the ordering."""
+        fields = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            if name in queryset.query.annotations:  # e.g. the search rank
+                fields.append(queryset.query.annotations[name].output_field)
+            else:
+                fields.append(queryset.model._meta.get_field(name))
+        return fields
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def get_key(self, row):
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(row, dict):  # .values() rows
+            return [row[name] for name in names]
+        return [row.serializable_value(name) for name in names]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_keyset_cursor(self.get_key(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_keyset_cursor(self.get_key(self.page[0]), reverse=True)
+
+    def encode_keyset_cursor(self, key, reverse):
+        data = json.dumps({"key": key, "reverse": reverse}, default=str)
+        encoded = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            key, reverse = cursor["key"], bool(cursor["reverse"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(key, list) or len(key) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # the values come from the client, they must fit the columns they filter
+        try:
+            key = [field.to_python(value) for field, value in zip(self.key_fields, key)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in key:
+            raise NotFound(self.invalid_cursor_message)
+        return {"key": key, "reverse": reverse}
+
+
+def estimate_count(queryset):
+    """
+    Returns the PostgreSQL planner estimate of the row count: pg_class.reltuples for
+    a whole table, the EXPLAIN row estimate for a filtered queryset.
+    Returns None when there is no estimate (other databases, never analyzed tables).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table is vacuumed or analyzed
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]["Plan Rows"]
+
+
+class EstimatedPage(Page):
+    """Page that knows if there is a next page from the rows, not from the count."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = has_next
+
+    def has_next(self):
+        return self.next_exists
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Paginator whose count is the planner estimate for large querysets. Below the
+    threshold the estimate is not reliable enough, so the exact COUNT(*) is used.
+    With an estimate, the pages are not bounded by it: a page is fetched with one
+    extra row to tell if there is a next page, and only a page without rows is
+    not found.
+    """
+
+    threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.threshold:
+            return super().count
+        self.estimated = True
+        return estimate
+
+    def validate_number(self, number):
+        self.count  # decides between the estimate and COUNT(*)
+        if not self.estimated:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        # an estimate below the rows already seen is raised to them
+        self.count = max(self.count, bottom + len(rows) + has_next)
+        return EstimatedPage(rows, number, self, has_next)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Page number pagination with an approximate "count" on large tables, so list
+    latency does not grow with the table size.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
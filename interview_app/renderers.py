@@ -0,0 +1,132 @@
+import csv
+import io
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib json is used without it
+    orjson = None
+
+# the types orjson formats differently than DRF (datetime "Z" suffix and milliseconds)
+# are passed to the DRF encoder
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson, with the same output as JSONRenderer: compact, UTF-8,
+    U+2028/U+2029 escaped, dates, datetimes, decimals and lazy strings formatted by the
+    DRF encoder. Falls back to JSONRenderer without orjson, for indented output (the
+    browsable API, "; indent=4") and for data orjson does not handle (integers over
+    64 bits, non-str keys...).
+    One difference is kept: NaN and Infinity are rendered as null, where the strict
+    JSONRenderer raises ValueError. Finding them would mean walking the data in Python
+    before orjson, and the only float column served (average_charges, an AVG of
+    integer charges) never holds them.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # valid JSON, but not valid javascript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+# region Export Renderers
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON, one object per line. render_rows renders a chunk of rows of
+    a streamed export, render a single response (e.g. an error).
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+    json_renderer = FastJSONRenderer()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.json_renderer.render(data) + b"\n"
+
+    def render_header(self, columns):
+        return b""
+
+    def render_rows(self, rows, columns):
+        return b"".join(self.json_renderer.render(row) + b"\n" for row in rows)
+
+
+def get_columns(serializer, prefix=""):
+    """
+    Returns the CSV columns of serializer, nested objects are flattened into
+    "field.nested_field" columns.
+    """
+    columns = []
+    for field in serializer._readable_fields:
+        name = prefix + field.field_name
+        if isinstance(field, serializers.Serializer):
+            columns.extend(get_columns(field, name + "."))
+        else:
+            columns.append(name)
+    return columns
+
+
+def lookup(row, column):
+    """Returns the value of a "field.nested_field" column, None under a null object."""
+    value = row
+    for name in column.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header of the flattened serializer fields (see get_columns). Null values
+    and null nested objects are empty cells, other lists and objects are JSON.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict):
+            data = {"data": data}
+        columns = list(data)
+        return self.render_header(columns) + self.render_rows([data], columns)
+
+    def render_header(self, columns):
+        return self.write([columns])
+
+    def render_rows(self, rows, columns):
+        return self.write(
+            [self.cell(lookup(row, column)) for column in columns] for row in rows
+        )
+
+    @staticmethod
+    def cell(value):
+        if value is None:
+            return ""
+        if isinstance(value, (list, dict)):
+            return NDJSONRenderer.json_renderer.render(value).decode()
+        return value
+
+    @staticmethod
+    def write(lines):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(lines)
+        return buffer.getvalue().encode()
+
+
+# endregion
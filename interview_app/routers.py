@@ -0,0 +1,112 @@
+import hashlib
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+# read replica aliases, see DATABASE_REPLICA_URLS
+REPLICAS = [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# reads go to the primary unless ReplicaMiddleware allows the replicas for a request,
+# so management commands and background work always read their own writes
+use_primary = ContextVar("use_primary", default=True)
+# the replica chosen for the request, all its reads see the same replica state
+request_replica = ContextVar("request_replica", default=None)
+
+
+def reads_from_replica():
+    return bool(REPLICAS) and not use_primary.get()
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of safe-method requests to the replica ReplicaMiddleware chose for
+    the request, everything else to the primary ("default"). Only the interview_app tables are read from the
+    replicas, an access token must be usable right after it is issued.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "interview_app" and reads_from_replica():
+            return request_replica.get() or random.choice(REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+class ReplicaMiddleware:
+    """
+    Allows the replicas for GET/HEAD/OPTIONS requests. After a write, the same client
+    (access token, or IP address without one) reads from the primary for
+    REPLICA_LAG_SECONDS, so it reads its own writes while the replicas catch up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not REPLICAS:
+            return self.get_response(request)
+
+        key = self.sticky_key(request)
+        if request.method in SAFE_METHODS:
+            contexts = self.route(cache.get(key) is not None)
+        else:
+            contexts = self.route(True)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.reset(contexts)
+        if request.method not in SAFE_METHODS:
+            cache.set(key, 1, settings.REPLICA_LAG_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not REPLICAS:
+            return await self.get_response(request)
+
+        key = self.sticky_key(request)
+        if request.method in SAFE_METHODS:
+            contexts = self.route(await cache.aget(key) is not None)
+        else:
+            contexts = self.route(True)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.reset(contexts)
+        if request.method not in SAFE_METHODS:
+            await cache.aset(key, 1, settings.REPLICA_LAG_SECONDS)
+        return response
+
+    @staticmethod
+    def route(primary):
+        """Picks the replica once per request, instead of once per query."""
+        return use_primary.set(primary), request_replica.set(random.choice(REPLICAS))
+
+    @staticmethod
+    def reset(contexts):
+        use_primary.reset(contexts[0])
+        request_replica.reset(contexts[1])
+
+    @staticmethod
+    def sticky_key(request):
+        client = request.headers.get("Authorization") or request.META.get(
+            "REMOTE_ADDR", ""
+        )
+        return f"primary:{hashlib.sha1(client.encode()).hexdigest()}"
@@ -1,3 +1,4 @@
+from functools import cached_property, lru_cache
 from rest_framework import serializers
 from .models import (
     Employee,
@@ -7,6 +8,8 @@ from .models import (
     Payment,
     Status,
     EmployeeManagesShipment,
+    ShipmentSummary,
+    PaymentSummary,
 )
 
 
@@ -140,16 +143,25 @@ class DeliveredShipmentSerializer(serializers.ModelSerializer):
         model = Shipment
         fields = "__all__"
 
+    @cached_property
+    def status_serializer(self):
+        """One StatusSerializer shared by all the rows of the list."""
+        return StatusSerializer()
+
     def get_status(self, obj):
         """
         Retrieves the related Status object through EmployeeManagesShipment and serializes it.
         """
-        # Get the related Status object through EmployeeManagesShipment
         # Get the first related EmployeeManagesShipment
-        ems = obj.employeemanagesshipment_set.first()
+        # "ems_list" is prefetched by the list views, .first() would run a query per shipment
+        ems_list = getattr(obj, "ems_list", None)
+        if ems_list is None:
+            ems = obj.employeemanagesshipment_set.select_related("Status_Sh_ID").first()
+        else:
+            ems = ems_list[0] if ems_list else None
         if ems and ems.Status_Sh_ID:
             # Serializes the related status object and returns the serialized data
-            return StatusSerializer(ems.Status_Sh_ID).data
+            return self.status_serializer.to_representation(ems.Status_Sh_ID)
         return None
 
 
@@ -167,3 +179,168 @@ class ShipmentCustomerSerializer(serializers.ModelSerializer):
 
 
 # endregion
+
+
+# region Summary Serializers
+class ShipmentSummarySerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ShipmentSummary materialized view, without the row number.
+    """
+
+    class Meta:
+        model = ShipmentSummary
+        exclude = ["id"]
+
+
+class PaymentSummarySerializer(serializers.ModelSerializer):
+    """
+    Serializer for the PaymentSummary materialized view, without the row number.
+    """
+
+    class Meta:
+        model = PaymentSummary
+        exclude = ["id"]
+
+
+# endregion
+
+
+# region Query Planning
+@lru_cache(maxsize=None)
+def get_related_paths(serializer_class):
+    """
+    Walks the nested serializers of serializer_class and returns the
+    (select_related, prefetch_related) paths needed to serialize a queryset
+    without a query per row.
+    """
+    select_related, prefetch_related = [], []
+
+    def walk(serializer, prefix, many):
+        for field in serializer.fields.values():
+            if field.source == "*" or not isinstance(field, serializers.BaseSerializer):
+                continue
+            path = prefix + field.source.replace(".", "__")
+            if isinstance(field, serializers.ListSerializer):
+                # reverse relations (many=True) and everything below them are prefetched
+                prefetch_related.append(path)
+                walk(field.child, path + "__", many=True)
+            else:
+                (prefetch_related if many else select_related).append(path)
+                walk(field, path + "__", many)
+
+    walk(serializer_class(), "", many=False)
+    return tuple(select_related), tuple(prefetch_related)
+
+
+@lru_cache(maxsize=None)
+def get_serializer_models(serializer_class):
+    """
+    Returns the models serialized by serializer_class and its nested serializers,
+    i.e. the models whose changes can change the response.
+    """
+    models = set()
+
+    def walk(serializer):
+        meta = getattr(serializer, "Meta", None)
+        if getattr(meta, "model", None) is not None:
+            models.add(meta.model)
+        for field in serializer.fields.values():
+            if isinstance(field, serializers.ListSerializer):
+                walk(field.child)
+            elif isinstance(field, serializers.BaseSerializer):
+                walk(field)
+
+    walk(serializer_class())
+    return frozenset(models)
+
+
+# endregion
+
+
+# region Values Plans
+class ValuesPlan:
+    """
+    A serializer compiled for .values() rows: the value paths to select and, for each
+    output field, the row key and the conversion of its value. represent() builds the
+    same data as serializer_class(..., many=True).data without model instances and
+    per field get_attribute/to_representation calls.
+    """
+
+    def __init__(self, paths, steps):
+        self.paths = tuple(paths)
+        self.steps = steps
+
+    def represent(self, rows):
+        return [self.build(self.steps, row) for row in rows]
+
+    @classmethod
+    def build(cls, steps, row):
+        data = {}
+        for name, key, convert, nested in steps:
+            value = row[key]
+            if value is None:
+                data[name] = None
+            elif nested is not None:
+                data[name] = cls.build(nested, row)
+            else:
+                data[name] = value if convert is None else convert(value)
+        return data
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+def get_converter(field):
+    """
+    Returns the to_representation of field for a value read from the database, None
+    when it returns the value unchanged.
+    """
+    if type(field) in (serializers.IntegerField, serializers.CharField):
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            raise UnsupportedField(field.field_name)
+        # .values() reads the foreign key column, i.e. the related pk
+        return None
+    return field.to_representation
+
+
+@lru_cache(maxsize=None)
+def get_values_plan(serializer_class):
+    """
+    Compiles serializer_class and its nested (forward relation) serializers into a
+    ValuesPlan. Returns None when a field can not be read from a values row (reverse
+    relations, method fields, dotted sources...), such serializers are used as they are.
+    """
+    paths = []
+
+    def compile_fields(serializer, prefix):
+        steps = []
+        for field in serializer._readable_fields:
+            if "." in field.source or field.source == "*":
+                raise UnsupportedField(field.field_name)
+            key = prefix + field.source
+            if isinstance(field, serializers.ModelSerializer):
+                # the foreign key column tells if the relation is null
+                paths.append(key)
+                steps.append(
+                    (field.field_name, key, None, compile_fields(field, key + "__"))
+                )
+            elif isinstance(field, serializers.BaseSerializer):
+                raise UnsupportedField(field.field_name)
+            elif isinstance(field, serializers.SerializerMethodField):
+                raise UnsupportedField(field.field_name)
+            else:
+                paths.append(key)
+                steps.append((field.field_name, key, get_converter(field), None))
+        return steps
+
+    try:
+        steps = compile_fields(serializer_class(), "")
+    except UnsupportedField:
+        return None
+    return ValuesPlan(paths, steps)
+
+
+# endregion
@@ -0,0 +1,24 @@
+from django.db import connections, router
+from .cache import invalidate
+from .models import PaymentSummary, ShipmentSummary
+
+# materialized views over Shipment and Payment, see migration 0005
+SUMMARY_MODELS = (ShipmentSummary, PaymentSummary)
+
+
+def refresh_summaries(concurrently=True):
+    """
+    Recomputes the materialized views from the fact tables and invalidates their
+    cached responses. A concurrent refresh does not block the readers of the view,
+    they see the old rows until it commits.
+    """
+    for model in SUMMARY_MODELS:
+        connection = connections[router.db_for_write(model)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "REFRESH MATERIALIZED VIEW {}{}".format(
+                    "CONCURRENTLY " if concurrently else "",
+                    connection.ops.quote_name(model._meta.db_table),
+                )
+            )
+        invalidate(model)
@@ -1,20 +1,145 @@
 from django.db import IntegrityError
 from django.test import TestCase
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth.models import User
-from oauth2_provider.models import Application
+from oauth2_provider.models import AccessToken, Application
 from datetime import date
 from .models import *
 from interview_app.serializers import *
+from interview_app.views import (
+    CustomerListCreateView,
+    EmployeeListCreateView,
+    EmployeeManagesShipmentListCreateView,
+    MembershipListCreateView,
+    PaymentListCreateView,
+    ShipmentListCreateView,
+    StatusListCreateView,
+    ExportView,
+)
+import base64
+import csv
+import gzip
+import json
+import math
+import tempfile
+import pyarrow.parquet
+from interview_app.columnar import stream_table
+from interview_app.summaries import SUMMARY_MODELS, refresh_summaries
+from rest_framework.renderers import JSONRenderer
+from rest_framework.throttling import UserRateThrottle
+from rest_framework.exceptions import ErrorDetail, ParseError
+from interview_app.renderers import FastJSONRenderer
+from interview_app.parsers import FastJSONParser
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from django.utils.translation import gettext_lazy
+from interview_app.pagination import (
+    EstimatedCountPaginator,
+    KeysetPagination,
+    estimate_count,
+)
 from django.core.cache import cache
-from unittest.mock import patch
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from interview_app.cache import (
+    acquire_lock,
+    decode_entry,
+    encode_entry,
+    get_metrics,
+    local_cache,
+    record,
+    reset_metrics,
+    get_timeout,
+    release_lock,
+    should_refresh,
+    wait_for_response,
+)
+from interview_app.routers import ReplicaMiddleware, ReplicaRouter, use_primary
+from django.test import RequestFactory
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.conf import settings
+from io import BytesIO, StringIO
+import os
+import shutil
+import time
+from interview_app.management.commands import load_data
+from drf.settings import parse_database_url
+from interview_app.management.commands.load_data import TABLES, dependency_graph
 
 # Create your tests here.
 
 
+def create_sample_data():
+    """
+    Creates 3 customers with a shipment, payment and status each, managed by one
+    employee. The membership end date and every other payment date are null.
+    """
+    membership = Membership.objects.create(M_ID=1, Start_date=date(2024, 1, 1))
+    employee = Employee.objects.create(
+        E_ID=1,
+        E_NAME="John Handler",
+        E_BRANCH="Main",
+        E_DESIGNATION="Handler",
+        E_ADDR="Handler Address",
+        E_CONT_NO=1234567890,
+    )
+    for i in range(1, 4):
+        customer = Customer.objects.create(
+            C_ID=i,
+            C_NAME=f'Müşteri "{i}"',
+            C_EMAIL_ID=f"customer{i}@example.com",
+            C_CONT_NO=9876543210,
+            C_ADDR="456 Avenue",
+            C_TYPE="Regular",
+            M_ID=membership,
+        )
+        shipment = Shipment.objects.create(
+            SH_ID=i,
+            C_ID=customer,
+            SH_CONTENT="Test Content",
+            SH_DOMAIN="Domestic",
+            SER_TYPE="Express",
+            SH_WEIGHT="5kg",
+            SH_CHARGES=100 * i,
+            SR_ADDR="Source Address",
+            DS_ADDR="Destination Address",
+        )
+        Payment.objects.create(
+            Payment_ID=f"payment-{i}",
+            C_ID=customer,
+            SH_ID=shipment,
+            AMOUNT=1000,
+            Payment_Status="PAID",
+            Payment_Mode="CARD PAYMENT",
+            Payment_Date=date(2024, 1, i) if i % 2 else None,
+        )
+        sh_status = Status.objects.create(
+            SH_ID=i, Current_Status="DELIVERED", Sent_date=date(2024, 1, 1)
+        )
+        EmployeeManagesShipment.objects.create(
+            Employee_E_ID=employee, Shipment_Sh_ID=shipment, Status_Sh_ID=sh_status
+        )
+
+
+def bearer_headers(user):
+    """Headers of a request authenticated with a new access token of user."""
+    token = AccessToken.objects.create(
+        user=user,
+        token=f"token-{user.pk}",
+        expires=datetime.now(timezone.utc) + timedelta(hours=1),
+        scope="read write",
+    )
+    return {"Authorization": f"Bearer {token.token}"}
+
+
 # region model test
 class ModelTests(TestCase):
     def setUp(self):
@@ -173,6 +298,408 @@ class SerializerTests(TestCase):
         self.assertEqual(serializer.data["status"]["Current_Status"], "DELIVERED")
 
 
+class ValuesPlanTests(APITestCase):
+    """The values plans must render the same JSON as the serializers."""
+
+    list_views = [
+        EmployeeListCreateView,
+        MembershipListCreateView,
+        CustomerListCreateView,
+        ShipmentListCreateView,
+        PaymentListCreateView,
+        StatusListCreateView,
+        EmployeeManagesShipmentListCreateView,
+    ]
+
+    def setUp(self):
+        cache.clear()
+        create_sample_data()
+
+    def test_same_json(self):
+        renderer = JSONRenderer()
+        for view in self.list_views:
+            serializer_class = view.serializer_class
+            with self.subTest(serializer_class.__name__):
+                plan = get_values_plan(serializer_class)
+                self.assertIsNotNone(plan)
+                queryset = view.queryset.order_by("rec_id")
+                self.assertEqual(
+                    renderer.render(plan.represent(queryset.values(*plan.paths))),
+                    renderer.render(serializer_class(queryset, many=True).data),
+                )
+
+    def test_unsupported_serializers(self):
+        # method fields and reverse relations keep using the serializer
+        self.assertIsNone(get_values_plan(DeliveredShipmentSerializer))
+        self.assertIsNone(get_values_plan(CustomerShipmentSerializer))
+
+    def test_list_endpoint(self):
+        self.client.force_authenticate(User.objects.create_user(username="testuser"))
+        with self.assertNumQueries(2):  # count and page
+            response = self.client.get(reverse("payment-list"))
+        payments = Payment.objects.order_by("rec_id")
+        expected = {
+            "count": 3,
+            "next": None,
+            "previous": None,
+            "results": PaymentSerializer(payments, many=True).data,
+        }
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+
+# endregion
+
+
+# region export test
+class ExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        create_sample_data()
+        self.client.force_authenticate(User.objects.create_user(username="testuser"))
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(f"{name}-export"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response
+
+    def test_ndjson_export(self):
+        response = self.export("shipment", ordering="-SH_CHARGES")
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(line) for line in response.getvalue().splitlines()]
+        shipments = Shipment.objects.order_by("-SH_CHARGES")
+        self.assertEqual(rows, ShipmentSerializer(shipments, many=True).data)
+
+    def test_csv_export(self):
+        response = self.export("payment", format="csv")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="payments.csv"'
+        )
+        rows = list(csv.DictReader(StringIO(response.getvalue().decode())))
+        self.assertEqual(len(rows), 3)
+        rows.sort(key=lambda row: row["Payment_ID"])
+        self.assertEqual(rows[0]["C_ID.C_NAME"], 'Müşteri "1"')
+        self.assertEqual(rows[0]["SH_ID.C_ID.M_ID"], str(Membership.objects.get().pk))
+        self.assertEqual(rows[0]["Payment_Date"], "2024-01-01")
+        self.assertEqual(rows[1]["Payment_Date"], "")
+
+    def test_export_filters(self):
+        response = self.export("customer", search="customer2")
+        rows = [json.loads(line) for line in response.getvalue().splitlines()]
+        self.assertEqual([row["C_ID"] for row in rows], [2])
+
+    async def test_export_streams_under_asgi(self):
+        # a sync iterator would be collected into a list before the first byte
+        headers = await sync_to_async(bearer_headers)(await User.objects.afirst())
+        response = await self.async_client.get(
+            reverse("payment-export"), {"format": "csv"}, headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(
+            content,
+            await sync_to_async(
+                lambda: self.export("payment", format="csv").getvalue()
+            )(),
+        )
+
+    @patch.object(ExportView, "chunk_size", 2)
+    def test_export_chunks(self):
+        response = self.export("status", format="csv")
+        # header, then the rows 2 at a time
+        chunks = list(response.streaming_content)
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [1, 2, 1])
+
+    def test_export_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse("shipment-export"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ColumnarExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        create_sample_data()
+        self.client.force_authenticate(User.objects.create_user(username="testuser"))
+
+    def read_parquet(self, data):
+        return pyarrow.parquet.read_table(BytesIO(data))
+
+    def test_parquet(self):
+        data = b"".join(stream_table(Payment.objects.all(), "parquet", chunk_size=2))
+        table = self.read_parquet(data)
+        # a row group per chunk
+        self.assertEqual(
+            pyarrow.parquet.ParquetFile(BytesIO(data)).metadata.num_row_groups, 2
+        )
+        # foreign keys hold rec_ids, the column names say so
+        self.assertEqual(
+            table.column_names,
+            [field.attname for field in Payment._meta.concrete_fields],
+        )
+        self.assertIn("C_ID_id", table.column_names)
+        rows = sorted(table.to_pylist(), key=lambda row: row["rec_id"])
+        payment = Payment.objects.order_by("rec_id").first()
+        self.assertEqual(rows[0]["C_ID_id"], payment.C_ID_id)
+        self.assertEqual(rows[0]["SH_ID_id"], payment.SH_ID_id)
+        self.assertEqual(rows[0]["Payment_Date"], date(2024, 1, 1))
+        self.assertIsNone(rows[1]["Payment_Date"])
+
+    def test_csv_gz(self):
+        data = b"".join(stream_table(Status.objects.all(), "csv.gz", chunk_size=2))
+        rows = list(csv.DictReader(StringIO(gzip.decompress(data).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["Sent_date"], "2024-01-01")
+        self.assertEqual(rows[0]["Delivery_date"], "")
+
+    def test_export_data_command(self):
+        with tempfile.TemporaryDirectory() as folder:
+            out = StringIO()
+            call_command("export_data", "shipments", output_dir=folder, stdout=out)
+            table = pyarrow.parquet.read_table(
+                os.path.join(folder, "shipments.parquet")
+            )
+            self.assertEqual(table.num_rows, 3)
+            self.assertIn("shipments:", out.getvalue())
+            # all tables by default
+            call_command("export_data", format="csv.gz", output_dir=folder, stdout=out)
+            self.assertEqual(
+                sorted(os.listdir(folder)),
+                [
+                    "payments.csv.gz",
+                    "shipments.csv.gz",
+                    "shipments.parquet",
+                    "statuses.csv.gz",
+                ],
+            )
+            with self.assertRaisesMessage(CommandError, "Unknown table customers"):
+                call_command("export_data", "customers", output_dir=folder)
+            with patch("interview_app.columnar.pyarrow", None):
+                with self.assertRaisesMessage(CommandError, "requires pyarrow"):
+                    call_command(
+                        "export_data", "shipments", format="parquet", output_dir=folder
+                    )
+
+    def test_endpoint(self):
+        url = reverse("columnar-export", args=["shipments", "parquet"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+        self.assertEqual(self.read_parquet(response.getvalue()).num_rows, 3)
+
+        url = reverse("columnar-export", args=["payments", "csv.gz"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header = gzip.decompress(response.getvalue()).split(b"\r\n")[0]
+        self.assertTrue(header.startswith(b"rec_id,"))
+        self.assertIn(b",C_ID_id,", header)
+
+    async def test_endpoint_streams_under_asgi(self):
+        headers = await sync_to_async(bearer_headers)(await User.objects.afirst())
+        url = reverse("columnar-export", args=["shipments", "parquet"])
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(self.read_parquet(content).num_rows, 3)
+
+    def test_endpoint_not_found(self):
+        for args in [("customers", "parquet"), ("shipments", "json")]:
+            response = self.client.get(reverse("columnar-export", args=args))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        with patch("interview_app.columnar.pyarrow", None):
+            url = reverse("columnar-export", args=["shipments", "parquet"])
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_endpoint_requires_authentication(self):
+        self.client.force_authenticate(None)
+        url = reverse("columnar-export", args=["shipments", "parquet"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+# endregion
+
+
+# region summary test
+class SummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        create_sample_data()
+        Shipment.objects.create(
+            SH_ID=4,
+            C_ID=Customer.objects.first(),
+            SH_CONTENT="Test Content",
+            SH_DOMAIN="International",
+            SER_TYPE="Regular",
+            SH_WEIGHT="5kg",
+            SH_CHARGES=1000,
+            SR_ADDR="Source Address",
+            DS_ADDR="Destination Address",
+        )
+        refresh_summaries()
+        self.client.force_authenticate(User.objects.create_user(username="testuser"))
+
+    def test_shipment_summary(self):
+        response = self.client.get(reverse("shipment-summary"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "SH_DOMAIN": "Domestic",
+                    "SER_TYPE": "Express",
+                    "shipment_count": 3,
+                    "total_charges": 600,
+                    "average_charges": 200.0,
+                },
+                {
+                    "SH_DOMAIN": "International",
+                    "SER_TYPE": "Regular",
+                    "shipment_count": 1,
+                    "total_charges": 1000,
+                    "average_charges": 1000.0,
+                },
+            ],
+        )
+        response = self.client.get(
+            reverse("shipment-summary"), {"ordering": "shipment_count"}
+        )
+        self.assertEqual([row["shipment_count"] for row in response.json()], [1, 3])
+
+    def test_payment_summary(self):
+        response = self.client.get(reverse("payment-summary"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # payments without a date are a month of their own
+        self.assertEqual(
+            [(row["month"], row["payment_count"]) for row in response.json()],
+            [("2024-01-01", 2), (None, 1)],
+        )
+        self.assertEqual(response.json()[0]["total_amount"], 2000)
+        self.assertEqual(response.json()[0]["Payment_Mode"], "CARD PAYMENT")
+        self.assertNotIn("id", response.json()[0])
+
+    def test_unique_grouping_columns(self):
+        # REFRESH ... CONCURRENTLY matches the rows on these, not on the row numbers
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename LIKE %s",
+                ["interview_app_%_summary"],
+            )
+            indexes = dict(cursor.fetchall())
+        self.assertEqual(
+            sorted(indexes), ["payment_summary_group_idx", "shipment_summary_group_idx"]
+        )
+        self.assertIn(
+            '(month, "Payment_Mode", "Payment_Status")',
+            indexes["payment_summary_group_idx"],
+        )
+        self.assertIn(
+            '("SH_DOMAIN", "SER_TYPE")', indexes["shipment_summary_group_idx"]
+        )
+
+    def test_summaries_change_on_refresh(self):
+        url = reverse("shipment-summary")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        Shipment.objects.filter(SH_ID=4).delete()
+        # as of the last refresh
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(len(response.json()), 2)
+
+        out = StringIO()
+        call_command("refresh_summaries", stdout=out)
+        self.assertIn("refreshed", out.getvalue())
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.json()), 1)
+
+    def test_refresh_summaries_interval(self):
+        with self.assertRaises(CommandError):
+            call_command("refresh_summaries", interval=0)
+        # repeats until interrupted
+        with patch(
+            "interview_app.management.commands.refresh_summaries.time.sleep",
+            side_effect=[None, KeyboardInterrupt],
+        ) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("refresh_summaries", interval=60, stdout=StringIO())
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.get(reverse("payment-summary")).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+
+# endregion
+
+
+# region renderer test
+class FastJSONTests(TestCase):
+    """FastJSONRenderer must render the same bytes as JSONRenderer."""
+
+    data = {
+        "results": [
+            {
+                "date": date(2024, 1, 2),
+                "datetime": datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+                "decimal": Decimal("1.50"),
+                "none": None,
+                "float": 0.1,
+                "text": 'Müşteri \u2028 \u2029 "quoted"',
+                "lazy": gettext_lazy("Not found."),
+                "error": ErrorDetail("Invalid.", code="invalid"),
+            }
+        ],
+    }
+
+    def assertSameRender(self, data, media_type=None, context=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type, context),
+            JSONRenderer().render(data, media_type, context),
+        )
+
+    def test_same_bytes(self):
+        self.assertSameRender(self.data)
+        self.assertSameRender(None)
+
+    def test_fallbacks(self):
+        # integers over 64 bits, indented output, orjson not installed
+        self.assertSameRender({"big": 2**70})
+        self.assertSameRender(self.data, "application/json; indent=4")
+        with patch("interview_app.renderers.orjson", None):
+            self.assertSameRender(self.data)
+
+    def test_non_finite_floats(self):
+        # JSONRenderer is strict, FastJSONRenderer writes null (see its docstring)
+        for value in [float("nan"), float("inf"), float("-inf")]:
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"float": value})
+            self.assertEqual(
+                FastJSONRenderer().render({"float": value}), b'{"float":null}'
+            )
+
+    def test_serializer_output(self):
+        membership = Membership.objects.create(M_ID=1, Start_date=date(2024, 1, 1))
+        self.assertSameRender(MembershipSerializer(membership).data)
+
+    def test_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(
+            parser.parse(BytesIO('{"C_NAME": "Müşteri"}'.encode())),
+            {"C_NAME": "Müşteri"},
+        )
+        for body in [b"{invalid", b'{"value": NaN}', b""]:
+            with self.assertRaises(ParseError):
+                parser.parse(BytesIO(body))
+
+
 # endregion
 
 
@@ -267,8 +794,8 @@ class APITests(APITestCase):
             response = self.client.get(url)
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        # Second request should hit cache
-        with self.assertNumQueries(0):
+        # Second request should hit cache, only the token is looked up
+        with self.assertNumQueries(1):
             response = self.client.get(url)
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
@@ -458,6 +985,53 @@ class CustomEndpointTests(APITestCase):
         self.assertEqual(response.json()["results"][1]["SH_ID"], 1)
 
 
+class CustomerSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user(username="testuser"))
+        membership = Membership.objects.create(M_ID=1)
+        for i, (name, email, address) in enumerate(
+            [
+                ("Ayse Demir", "ayse.ahmet@example.com", "Ankara"),
+                ("Ahmet Yilmaz", "ahmet@firma.com", "Kadikoy Istanbul"),
+                ("Mehmet Ahmetoglu", "mehmet@example.com", "Izmir"),
+            ]
+        ):
+            Customer.objects.create(
+                C_ID=i,
+                C_NAME=name,
+                C_EMAIL_ID=email,
+                C_CONT_NO=9876543210,
+                C_ADDR=address,
+                C_TYPE="Regular",
+                M_ID=membership,
+            )
+
+    def search(self, term):
+        response = self.client.get(reverse("customer-list"), {"search": term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [customer["C_NAME"] for customer in response.json()["results"]]
+
+    def test_search_ranking(self):
+        # name matches rank above email matches
+        self.assertEqual(
+            self.search("ahm"), ["Ahmet Yilmaz", "Mehmet Ahmetoglu", "Ayse Demir"]
+        )
+
+    def test_search_email_and_address(self):
+        self.assertEqual(self.search("firma"), ["Ahmet Yilmaz"])
+        self.assertEqual(self.search("ahmet@fir"), ["Ahmet Yilmaz"])
+        self.assertEqual(self.search("ankara"), ["Ayse Demir"])
+        # every term must match
+        self.assertEqual(self.search("ahm istanbul"), ["Ahmet Yilmaz"])
+
+    def test_search_name_substring(self):
+        self.assertEqual(self.search("hmet"), ["Ahmet Yilmaz", "Mehmet Ahmetoglu"])
+
+    def test_search_operators_are_text(self):
+        self.assertEqual(self.search("ahm:* | !x'"), [])
+
+
 class ShipmentViewTests(APITestCase):
     def setUp(self):
         self.membership = Membership.objects.create(
@@ -592,3 +1166,1221 @@ class DeliveredShipmentViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()["results"]), 1)
         self.assertEqual(response.json()["results"][0]["SH_ID"], 1)
+
+
+class QueryCountTests(APITestCase):
+    """Query count of each endpoint must not grow with the page size."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.application = Application.objects.create(
+            name="Test Application",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            hash_client_secret=False,
+            user=self.user,
+        )
+        self.client = APIClient()
+        self.membership = Membership.objects.create(
+            M_ID=1, Start_date=date(2024, 1, 1), End_date=date(2024, 12, 31)
+        )
+        self.employee = Employee.objects.create(
+            E_ID=1,
+            E_NAME="John Handler",
+            E_BRANCH="Main",
+            E_DESIGNATION="Handler",
+            E_ADDR="Handler Address",
+            E_CONT_NO=1234567890,
+        )
+        for i in range(1, 6):
+            customer = Customer.objects.create(
+                C_ID=i,
+                C_NAME=f"Customer {i}",
+                C_EMAIL_ID=f"customer{i}@example.com",
+                C_CONT_NO=9876543210,
+                C_ADDR="456 Avenue",
+                C_TYPE="Regular",
+                M_ID=self.membership,
+            )
+            shipment = Shipment.objects.create(
+                SH_ID=i,
+                C_ID=customer,
+                SH_CONTENT="Test Content",
+                SH_DOMAIN="Domestic",
+                SER_TYPE="Express",
+                SH_WEIGHT="5kg",
+                SH_CHARGES=100 * i,
+                SR_ADDR="Source Address",
+                DS_ADDR="Destination Address",
+            )
+            Payment.objects.create(
+                Payment_ID=f"payment-{i}",
+                C_ID=customer,
+                SH_ID=shipment,
+                AMOUNT=1000,
+                Payment_Status="PAID",
+                Payment_Mode="CARD PAYMENT",
+                Payment_Date=date(2024, 1, i),
+            )
+            sh_status = Status.objects.create(
+                SH_ID=i,
+                Current_Status="DELIVERED" if i % 2 else "NOT DELIVERED",
+                Sent_date=date(2024, 1, 1),
+                Delivery_date=date(2024, 1, 2),
+            )
+            EmployeeManagesShipment.objects.create(
+                Employee_E_ID=self.employee,
+                Shipment_Sh_ID=shipment,
+                Status_Sh_ID=sh_status,
+            )
+        self.customer = customer
+
+    def get_token(self):
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "testuser",
+            "password": "testpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        response = self.client.post(token_url, data)
+        return response.json()["access_token"]
+
+    def assertMaxQueries(self, url, max_queries):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(
+            len(queries),
+            max_queries,
+            f"{url} executed {len(queries)} queries, expected at most {max_queries}",
+        )
+
+    def test_endpoint_query_counts(self):
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        # token lookup + count + page (+ one query per prefetched relation)
+        self.assertMaxQueries(reverse("shipment-list"), 3)
+        self.assertMaxQueries(reverse("payment-list"), 3)
+        self.assertMaxQueries(reverse("employeemanagesshipment-list"), 3)
+        self.assertMaxQueries(
+            reverse(
+                "customer-shipment-details", kwargs={"rec_id": self.customer.rec_id}
+            ),
+            3,
+        )
+        # token lookup + count + page + prefetched statuses
+        self.assertMaxQueries(reverse("delivered-shipment-list"), 4)
+        self.assertMaxQueries(reverse("notdelivered-shipment-list"), 4)
+
+    def test_delivered_shipment_status(self):
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(reverse("notdelivered-shipment-list"))
+        results = response.json()["results"]
+        self.assertEqual(sorted(row["SH_ID"] for row in results), [2, 4])
+        for row in results:
+            self.assertEqual(row["status"]["SH_ID"], row["SH_ID"])
+            self.assertEqual(row["status"]["Current_Status"], "NOT DELIVERED")
+            self.assertEqual(row["status"]["Sent_date"], "2024-01-01")
+
+    def test_get_related_paths(self):
+        self.assertEqual(
+            get_related_paths(PaymentSerializer), (("C_ID", "SH_ID", "SH_ID__C_ID"), ())
+        )
+        self.assertEqual(
+            get_related_paths(CustomerShipmentSerializer),
+            ((), ("shipment_set", "shipment_set__C_ID")),
+        )
+
+
+class IndexUsageTests(APITestCase):
+    """The filtered and ordered endpoints must use their indexes on a large table."""
+
+    size = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        membership = Membership.objects.create(M_ID=1)
+        employee = Employee.objects.create(
+            E_ID=1,
+            E_NAME="John Handler",
+            E_BRANCH="Main",
+            E_DESIGNATION="Handler",
+            E_ADDR="Handler Address",
+            E_CONT_NO=1234567890,
+        )
+        customers = Customer.objects.bulk_create(
+            Customer(
+                C_ID=i,
+                C_NAME=f"Customer {i:05x}",
+                C_EMAIL_ID=f"customer{i}@example.com",
+                C_CONT_NO=9876543210,
+                C_ADDR="456 Avenue",
+                C_TYPE="Regular",
+                M_ID=membership,
+            )
+            for i in range(cls.size)
+        )
+        shipments = Shipment.objects.bulk_create(
+            Shipment(
+                SH_ID=i,
+                C_ID=customers[i],
+                SH_CONTENT="Test Content",
+                SH_DOMAIN="Domestic",
+                SER_TYPE="Express",
+                SH_WEIGHT="5kg",
+                SH_CHARGES=i * 7919 % cls.size,
+                SR_ADDR="Source Address",
+                DS_ADDR="Destination Address",
+            )
+            for i in range(cls.size)
+        )
+        # like real data, few shipments are delivered at any time
+        statuses = Status.objects.bulk_create(
+            Status(
+                SH_ID=i,
+                Current_Status="DELIVERED" if i % 50 == 0 else "NOT DELIVERED",
+            )
+            for i in range(cls.size)
+        )
+        EmployeeManagesShipment.objects.bulk_create(
+            EmployeeManagesShipment(
+                Employee_E_ID=employee,
+                Shipment_Sh_ID=shipment,
+                Status_Sh_ID=sh_status,
+            )
+            for shipment, sh_status in zip(shipments, statuses)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user(username="testuser"))
+
+    def assertUsesIndex(self, url, clause, table, *indexes):
+        """EXPLAINs the queries of the endpoint that contain clause."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if clause in query["sql"]:
+                    cursor.execute(f"EXPLAIN {query['sql']}")
+                    plans.append("\n".join(row[0] for row in cursor.fetchall()))
+        self.assertTrue(plans, f"{url} did not run {clause}")
+        for plan in plans:
+            for index in indexes:
+                self.assertIn(index, plan)
+            self.assertNotIn(f"Seq Scan on {table}", plan)
+
+    def test_delivered_shipments_use_partial_index(self):
+        self.assertUsesIndex(
+            reverse("delivered-shipment-list"),
+            '"Current_Status" = ',
+            "interview_app_status",
+            "status_delivered_idx",
+        )
+
+    def test_shipment_ordering_uses_index(self):
+        self.assertUsesIndex(
+            reverse("shipment-list") + "?ordering=-SH_CHARGES",
+            'ORDER BY "interview_app_shipment"."SH_CHARGES"',
+            "interview_app_shipment",
+            "shipment_charges_idx",
+        )
+
+    def test_customer_search_uses_search_indexes(self):
+        # word prefixes use the tsvector index, name substrings the trigram index
+        self.assertUsesIndex(
+            reverse("customer-list") + "?search=0a1f",
+            "@@",
+            "interview_app_customer",
+            "customer_search_idx",
+            "customer_name_trgm_idx",
+        )
+
+
+class CacheInvalidationTests(APITestCase):
+    """Cached responses must change as soon as a model they include changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.application = Application.objects.create(
+            name="Test Application",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            hash_client_secret=False,
+            user=self.user,
+        )
+        self.client = APIClient()
+        self.membership = Membership.objects.create(
+            M_ID=1, Start_date=date(2024, 1, 1), End_date=date(2024, 12, 31)
+        )
+        self.customer = Customer.objects.create(
+            C_ID=1,
+            C_NAME="Old Name",
+            C_EMAIL_ID="customer@example.com",
+            C_CONT_NO=9876543210,
+            C_ADDR="456 Avenue",
+            C_TYPE="Regular",
+            M_ID=self.membership,
+        )
+        self.shipment = Shipment.objects.create(
+            SH_ID=1,
+            C_ID=self.customer,
+            SH_CONTENT="Test Content",
+            SH_DOMAIN="Domestic",
+            SER_TYPE="Express",
+            SH_WEIGHT="5kg",
+            SH_CHARGES=100,
+            SR_ADDR="Source Address",
+            DS_ADDR="Destination Address",
+        )
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "testuser",
+            "password": "testpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        token = self.client.post(token_url, data).json()["access_token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_update_invalidates_dependent_responses(self):
+        detail_url = reverse("customer-detail", kwargs={"pk": self.customer.rec_id})
+        nested_url = reverse(
+            "customer-shipment-details", kwargs={"rec_id": self.customer.rec_id}
+        )
+        shipments_url = reverse("shipment-list")
+        for url in (detail_url, nested_url, shipments_url):
+            self.client.get(url)
+
+        response = self.client.patch(detail_url, {"C_NAME": "New Name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(detail_url).json()["C_NAME"], "New Name")
+        self.assertEqual(self.client.get(nested_url).json()["C_NAME"], "New Name")
+        shipment = self.client.get(shipments_url).json()["results"][0]
+        self.assertEqual(shipment["C_ID"]["C_NAME"], "New Name")
+
+    def test_create_and_delete_invalidate_list(self):
+        url = reverse("shipment-list")
+        self.assertEqual(self.client.get(url).json()["count"], 1)
+        self.shipment.delete()
+        self.assertEqual(self.client.get(url).json()["count"], 0)
+
+    def test_unrelated_change_keeps_cached_response(self):
+        url = reverse("customer-detail", kwargs={"pk": self.customer.rec_id})
+        self.client.get(url)
+        Customer.objects.create(
+            C_ID=2,
+            C_NAME="Other Customer",
+            C_EMAIL_ID="other@example.com",
+            C_CONT_NO=9876543210,
+            C_ADDR="456 Avenue",
+            C_TYPE="Regular",
+            M_ID=self.membership,
+        )
+        Employee.objects.create(
+            E_ID=1,
+            E_NAME="John Doe",
+            E_BRANCH="Main",
+            E_DESIGNATION="Manager",
+            E_ADDR="123 Street",
+            E_CONT_NO=1234567890,
+        )
+        # only the token lookup, the response comes from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["C_NAME"], "Old Name")
+
+    def test_tokens_share_cached_response(self):
+        url = reverse("shipment-list")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        User.objects.create_user(username="otheruser", password="otherpass123")
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "otheruser",
+            "password": "otherpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        token = self.client.post(token_url, data).json()["access_token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+    def test_cached_response_requires_authentication(self):
+        url = reverse("shipment-list")
+        self.client.get(url)
+        self.client.credentials()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_stats(self):
+        reset_metrics()
+        url = reverse("shipment-list")
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url)
+        out = StringIO()
+        call_command("cache_stats", reset=True, stdout=out)
+        self.assertIn(
+            "ShipmentListCreateView: 2 hits (0 local), 1 misses (66.7% hit rate)",
+            out.getvalue(),
+        )
+        self.assertEqual(get_metrics(), {})
+
+
+class StampedeProtectionTests(APITestCase):
+    """Expired or missing responses are rebuilt by one request at a time."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.application = Application.objects.create(
+            name="Test Application",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            hash_client_secret=False,
+            user=self.user,
+        )
+        self.client = APIClient()
+        self.employee = Employee.objects.create(
+            E_ID=1,
+            E_NAME="John Doe",
+            E_BRANCH="Main",
+            E_DESIGNATION="Manager",
+            E_ADDR="123 Street",
+            E_CONT_NO=1234567890,
+        )
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "testuser",
+            "password": "testpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        token = self.client.post(token_url, data).json()["access_token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse("employee-list")
+
+    def after_expiry(self):
+        """Moves the clock of the cache layer past the TTL of the cached responses."""
+        clock = Mock(wraps=time)
+        clock.time.return_value = time.time() + settings.CACHE_TTL_SECONDS + 1
+        return patch("interview_app.cache.time", clock)
+
+    def hold_lock(self):
+        return patch("interview_app.cache.acquire_lock", return_value=None)
+
+    def test_expired_response_is_rebuilt(self):
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+        with self.after_expiry():
+            self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+
+    def test_stale_response_served_while_rebuilding(self):
+        self.client.get(self.url)
+        with self.after_expiry(), self.hold_lock():
+            # only the token lookup
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(response.json()["results"][0]["E_NAME"], "John Doe")
+
+    def test_missing_response_built_after_lock_timeout(self):
+        with self.hold_lock(), self.settings(CACHE_LOCK_SECONDS=0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_waiters_stop_when_the_lock_is_released(self):
+        token = acquire_lock("test-key")
+        self.assertIsNotNone(token)
+        self.assertIsNone(acquire_lock("test-key"))
+        # the lock holder did not store a response (an error, a 404...)
+        release_lock("test-key", token)
+        started = time.monotonic()
+        self.assertIsNone(wait_for_response("test-key"))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_release_lock_checks_the_token(self):
+        token = acquire_lock("test-key")
+        # a request whose lock expired does not release the lock of another one
+        release_lock("test-key", "expired-token")
+        release_lock("test-key", None)
+        self.assertIsNone(acquire_lock("test-key"))
+        release_lock("test-key", token)
+        self.assertIsNotNone(acquire_lock("test-key"))
+
+    def test_should_refresh(self):
+        now = time.time()
+        self.assertFalse(should_refresh(now + 3600, 0.01))
+        self.assertTrue(should_refresh(now - 1, 0.01))
+
+
+class CachePayloadTests(TestCase):
+    def entry(self, content):
+        return (200, content, [["Content-Type", "application/json"]], 1.0, 0.5)
+
+    def test_small_body_is_not_compressed(self):
+        entry = self.entry(b'{"count": 0}')
+        payload = encode_entry(entry)
+        self.assertIn(b'{"count": 0}', payload)
+        self.assertEqual(decode_entry(payload), entry)
+
+    def test_large_body_is_compressed(self):
+        content = b'{"results": [%s]}' % b",".join(
+            b'{"C_NAME": "Customer", "C_ADDR": "456 Avenue"}' for _ in range(100)
+        )
+        entry = self.entry(content)
+        payload = encode_entry(entry)
+        self.assertLess(len(payload), len(content) / 5)
+        self.assertEqual(decode_entry(payload), entry)
+
+    def test_bytes_saved_reported(self):
+        reset_metrics()
+        record("CustomerListCreateView", "miss")
+        record("CustomerListCreateView", "raw_bytes", 4000)
+        record("CustomerListCreateView", "stored_bytes", 1000)
+        out = StringIO()
+        call_command("cache_stats", stdout=out)
+        self.assertIn(
+            "1000 bytes stored for 4000 bytes of responses (3000 bytes, 75.0% saved)",
+            out.getvalue(),
+        )
+        reset_metrics()
+
+
+class LocalCacheTests(APITestCase):
+    """The in-process tier serves hot views without Redis until they change."""
+
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        reset_metrics()
+        patcher = patch.object(local_cache, "max_entries", 100)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(local_cache.clear)
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.application = Application.objects.create(
+            name="Test Application",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            hash_client_secret=False,
+            user=self.user,
+        )
+        self.client = APIClient()
+        self.employee = Employee.objects.create(
+            E_ID=1,
+            E_NAME="John Doe",
+            E_BRANCH="Main",
+            E_DESIGNATION="Manager",
+            E_ADDR="123 Street",
+            E_CONT_NO=1234567890,
+        )
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "testuser",
+            "password": "testpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        token = self.client.post(token_url, data).json()["access_token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_local_hit_skips_redis(self):
+        url = reverse("employee-list")
+        self.client.get(url)
+        # any use of the Redis cache would fail
+        with patch("interview_app.cache.cache", Mock(spec=[])):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(get_metrics()["EmployeeListCreateView"]["local_hit"], 1)
+
+    def test_change_drops_local_copy(self):
+        url = reverse("employee-list")
+        self.client.get(url)
+        self.employee.E_NAME = "Jane Doe"
+        self.employee.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["results"][0]["E_NAME"], "Jane Doe")
+
+    def test_lru_eviction(self):
+        with patch.object(local_cache, "max_entries", 2):
+            local_cache.set("a", 1)
+            local_cache.set("b", 2)
+            local_cache.get("a")
+            local_cache.set("c", 3)
+            self.assertEqual(local_cache.get("a"), 1)
+            self.assertIsNone(local_cache.get("b"))
+            self.assertEqual(local_cache.get("c"), 3)
+
+
+class AsyncViewTests(TestCase):
+    """The async endpoints return the same JSON as their sync counterparts."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.application = Application.objects.create(
+            name="Test Application",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            hash_client_secret=False,
+            user=self.user,
+        )
+        self.membership = Membership.objects.create(
+            M_ID=1, Start_date=date(2024, 1, 1), End_date=date(2024, 12, 31)
+        )
+        employee = Employee.objects.create(
+            E_ID=1,
+            E_NAME="John Handler",
+            E_BRANCH="Main",
+            E_DESIGNATION="Handler",
+            E_ADDR="Handler Address",
+            E_CONT_NO=1234567890,
+        )
+        for i in range(1, 4):
+            customer = Customer.objects.create(
+                C_ID=i,
+                C_NAME=f"Customer {i}",
+                C_EMAIL_ID=f"customer{i}@example.com",
+                C_CONT_NO=9876543210,
+                C_ADDR="456 Avenue",
+                C_TYPE="Regular",
+                M_ID=self.membership,
+            )
+            shipment = Shipment.objects.create(
+                SH_ID=i,
+                C_ID=customer,
+                SH_CONTENT="Test Content",
+                SH_DOMAIN="Domestic",
+                SER_TYPE="Express",
+                SH_WEIGHT="5kg",
+                SH_CHARGES=100 * i,
+                SR_ADDR="Source Address",
+                DS_ADDR="Destination Address",
+            )
+            Payment.objects.create(
+                Payment_ID=f"payment-{i}",
+                C_ID=customer,
+                SH_ID=shipment,
+                AMOUNT=1000,
+                Payment_Status="PAID",
+                Payment_Mode="CARD PAYMENT",
+                Payment_Date=date(2024, 1, i),
+            )
+            sh_status = Status.objects.create(
+                SH_ID=i,
+                Current_Status="DELIVERED" if i % 2 else "NOT DELIVERED",
+                Sent_date=date(2024, 1, 1),
+                Delivery_date=date(2024, 1, 2),
+            )
+            EmployeeManagesShipment.objects.create(
+                Employee_E_ID=employee, Shipment_Sh_ID=shipment, Status_Sh_ID=sh_status
+            )
+        self.customer = customer
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "testuser",
+            "password": "testpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        token = self.client.post(token_url, data).json()["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def test_same_json_as_sync_views(self):
+        urls = [
+            ("customer-list", {}),
+            ("shipment-list", {}),
+            ("payment-list", {}),
+            ("employeemanagesshipment-list", {}),
+            ("delivered-shipment-list", {}),
+            ("customer-detail", {"pk": self.customer.rec_id}),
+            ("customer-shipment-details", {"rec_id": self.customer.rec_id}),
+        ]
+        for name, kwargs in urls:
+            sync_response = await self.async_client.get(
+                reverse(name, kwargs=kwargs), headers=self.headers
+            )
+            async_response = await self.async_client.get(
+                reverse(f"async-{name}", kwargs=kwargs), headers=self.headers
+            )
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.json(), sync_response.json(), name)
+
+    async def test_filters_and_pagination(self):
+        response = await self.async_client.get(
+            reverse("async-customer-list"),
+            {"search": "Customer 2"},
+            headers=self.headers,
+        )
+        self.assertEqual(
+            [row["C_ID"] for row in response.json()["results"]],
+            [2],
+        )
+        response = await self.async_client.get(
+            reverse("async-shipment-list"),
+            {"ordering": "-SH_CHARGES"},
+            headers=self.headers,
+        )
+        self.assertEqual(
+            [row["SH_CHARGES"] for row in response.json()["results"]],
+            [300, 200, 100],
+        )
+        response = await self.async_client.get(
+            reverse("async-shipment-list"), {"page": 5}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_middleware_chain_runs_async(self):
+        # a sync only middleware makes Django run every async request in a thread,
+        # the adapted handlers are logged in DEBUG mode
+        with self.settings(DEBUG=True):
+            with self.assertNoLogs("django.request", level="DEBUG"):
+                ASGIHandler()
+
+    async def test_token_looked_up_once(self):
+        # the view uses the credentials found by OAuth2TokenMiddleware
+        with patch("interview_app.async_views.authenticate") as authenticate:
+            response = await self.async_client.get(
+                reverse("async-customer-list"), headers=self.headers
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        authenticate.assert_not_called()
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse("async-customer-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(
+            reverse("async-customer-list"), headers={"Authorization": "Bearer wrong"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_missing_object(self):
+        response = await self.async_client.get(
+            reverse("async-customer-detail", kwargs={"pk": 0}), headers=self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_throttle_shared_with_sync_views(self):
+        # one REQUEST_PER_MIN for the sync and async endpoints together
+        with patch.object(UserRateThrottle, "THROTTLE_RATES", {"user": "2/minute"}):
+            sync_response = await self.async_client.get(
+                reverse("customer-list"), headers=self.headers
+            )
+            async_response = await self.async_client.get(
+                reverse("async-customer-list"), headers=self.headers
+            )
+            self.assertEqual(sync_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+            for name in ("customer-list", "async-customer-list"):
+                response = await self.async_client.get(
+                    reverse(name), headers=self.headers
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_429_TOO_MANY_REQUESTS, name
+                )
+
+    async def test_cached_until_changed(self):
+        url = reverse("async-customer-detail", kwargs={"pk": self.customer.rec_id})
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response["X-Cache"], "MISS")
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        self.customer.C_NAME = "New Name"
+        await self.customer.asave()
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["C_NAME"], "New Name")
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_parse_database_url(self):
+        config = parse_database_url("postgresql://user:pass@db:5433/logistics")
+        self.assertEqual(config["NAME"], "logistics")
+        self.assertEqual(config["PORT"], 5433)
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertEqual(config["OPTIONS"], {})
+
+    def test_parse_database_url_options(self):
+        config = parse_database_url(
+            "postgresql://user:pass@db/logistics?conn_max_age=0"
+            "&conn_health_checks=false&sslmode=require"
+        )
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertFalse(config["CONN_HEALTH_CHECKS"])
+        self.assertEqual(config["OPTIONS"], {"sslmode": "require"})
+
+    def test_parse_database_url_pool(self):
+        config = parse_database_url(
+            "postgresql://user:pass@db/logistics?pool=true&pool_max_size=20"
+        )
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertEqual(config["OPTIONS"], {"pool": {"max_size": 20}})
+
+    def test_parse_database_url_asgi(self):
+        # persistent connections are not reused across the threads of async requests
+        url = "postgresql://user:pass@db/logistics"
+        self.assertEqual(parse_database_url(url, asgi=True)["CONN_MAX_AGE"], 0)
+        config = parse_database_url(f"{url}?conn_max_age=30", asgi=True)
+        self.assertEqual(config["CONN_MAX_AGE"], 30)
+
+
+@patch("interview_app.routers.REPLICAS", ["replica_1"])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_database(self, method, authorization):
+        """Runs a request through ReplicaMiddleware, returns the database it reads."""
+        middleware = ReplicaMiddleware(
+            lambda request: self.router.db_for_read(Customer)
+        )
+        request = getattr(self.factory, method)(
+            "/api/customers/", headers={"Authorization": authorization}
+        )
+        return middleware(request)
+
+    def test_router(self):
+        self.assertEqual(self.router.db_for_read(Customer), "default")
+        context = use_primary.set(False)
+        try:
+            self.assertEqual(self.router.db_for_read(Customer), "replica_1")
+            # access tokens are always read from the primary
+            self.assertEqual(self.router.db_for_read(User), "default")
+            self.assertEqual(self.router.db_for_write(Customer), "default")
+        finally:
+            use_primary.reset(context)
+        self.assertFalse(self.router.allow_migrate("replica_1", "interview_app"))
+
+    def test_middleware_sticky_after_write(self):
+        self.assertEqual(self.read_database("get", "Bearer a"), "replica_1")
+        self.assertEqual(self.read_database("post", "Bearer a"), "default")
+        # the writing client reads its own writes, other clients use the replica
+        self.assertEqual(self.read_database("get", "Bearer a"), "default")
+        self.assertEqual(self.read_database("get", "Bearer b"), "replica_1")
+
+    @patch("interview_app.routers.REPLICAS", ["replica_1", "replica_2"])
+    def test_replica_chosen_once_per_request(self):
+        middleware = ReplicaMiddleware(
+            lambda request: {self.router.db_for_read(Customer) for _ in range(20)}
+        )
+        for _ in range(5):
+            databases = middleware(self.factory.get("/api/customers/"))
+            self.assertEqual(len(databases), 1)
+            self.assertIn(databases.pop(), ["replica_1", "replica_2"])
+
+    def test_cache_timeout_after_change(self):
+        changed = time.time_ns()
+        self.assertEqual(get_timeout(300, [changed]), 300)
+        context = use_primary.set(False)
+        try:
+            # a response read from a replica right after a change is kept briefly
+            self.assertEqual(get_timeout(300, [changed]), settings.REPLICA_LAG_SECONDS)
+            old = changed - (settings.REPLICA_LAG_SECONDS + 1) * 10**9
+            self.assertEqual(get_timeout(300, [old]), 300)
+        finally:
+            use_primary.reset(context)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.application = Application.objects.create(
+            name="Test Application",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            hash_client_secret=False,
+            user=self.user,
+        )
+        self.client = APIClient()
+        membership = Membership.objects.create(
+            M_ID=1, Start_date=date(2024, 1, 1), End_date=date(2024, 12, 31)
+        )
+        customer = Customer.objects.create(
+            C_ID=1,
+            C_NAME="Test Customer",
+            C_EMAIL_ID="test@example.com",
+            C_CONT_NO=9876543210,
+            C_ADDR="456 Avenue",
+            C_TYPE="Regular",
+            M_ID=membership,
+        )
+        # repeated charges, so rec_id has to break the ties
+        for sh_id, charges in enumerate([300, 100, 200, 100, 300, 200, 100], start=1):
+            Shipment.objects.create(
+                SH_ID=sh_id,
+                C_ID=customer,
+                SH_CONTENT="Test Content",
+                SH_DOMAIN="Domestic",
+                SER_TYPE="Express",
+                SH_WEIGHT="5kg",
+                SH_CHARGES=charges,
+                SR_ADDR="Source Address",
+                DS_ADDR="Destination Address",
+            )
+        cache.clear()
+
+    def get_token(self):
+        token_url = reverse("oauth2_provider:token")
+        data = {
+            "grant_type": "password",
+            "username": "testuser",
+            "password": "testpass123",
+            "client_id": self.application.client_id,
+            "client_secret": self.application.client_secret,
+        }
+        response = self.client.post(token_url, data)
+        return response.json()["access_token"]
+
+    def walk(self, url, link):
+        """Follows the next/previous links and returns the SH_IDs of every page."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.json())
+            pages.append([row["SH_ID"] for row in response.json()["results"]])
+            url = response.json()[link]
+        return pages
+
+    @patch.object(KeysetPagination, "page_size", 3)
+    @patch.object(ShipmentListCreateView, "pagination_class", KeysetPagination)
+    def test_keyset_pagination(self):
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        # default ordering is rec_id
+        pages = self.walk(reverse("shipment-list"), "next")
+        self.assertEqual(pages, [[1, 2, 3], [4, 5, 6], [7]])
+
+        # ordering filter: (SH_CHARGES, rec_id)
+        pages = self.walk(reverse("shipment-list") + "?ordering=SH_CHARGES", "next")
+        self.assertEqual(pages, [[2, 4, 7], [3, 6, 1], [5]])
+        pages = self.walk(reverse("shipment-list") + "?ordering=-SH_CHARGES", "next")
+        self.assertEqual(pages, [[5, 1, 6], [3, 7, 4], [2]])
+
+        # walk back from the last page
+        response = self.client.get(reverse("shipment-list") + "?ordering=SH_CHARGES")
+        last_page = self.client.get(response.json()["next"]).json()["next"]
+        pages = self.walk(last_page, "previous")
+        self.assertEqual(pages, [[5], [3, 6, 1], [2, 4, 7]])
+
+    @patch.object(ShipmentListCreateView, "pagination_class", KeysetPagination)
+    def test_keyset_pagination_invalid_cursor(self):
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(reverse("shipment-list") + "?cursor=invalid")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # well formed cursors whose values do not fit the key columns
+        for ordering, key in [
+            ("rec_id", ["abc"]),
+            ("rec_id", [None]),
+            ("rec_id", [[1]]),
+            ("SH_CHARGES", ["cheap", 1]),
+            ("SH_CHARGES", [100, {"rec_id": 1}]),
+        ]:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({"key": key, "reverse": False}).encode()
+            ).decode()
+            response = self.client.get(
+                reverse("shipment-list"), {"ordering": ordering, "cursor": cursor}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND, (ordering, key)
+            )
+
+
+class EstimatedCountPaginationTests(TestCase):
+    def setUp(self):
+        membership = Membership.objects.create(
+            M_ID=1, Start_date=date(2024, 1, 1), End_date=date(2024, 12, 31)
+        )
+        Customer.objects.bulk_create(
+            Customer(
+                C_ID=i,
+                C_NAME=f"Customer {i}",
+                C_EMAIL_ID="test@example.com",
+                C_CONT_NO=9876543210,
+                C_ADDR="456 Avenue",
+                C_TYPE="Regular" if i % 2 else "Wholesale",
+                M_ID=membership,
+            )
+            for i in range(1, 51)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE interview_app_customer")
+
+    def test_estimate_count(self):
+        self.assertEqual(estimate_count(Customer.objects.all()), 50)
+        estimate = estimate_count(Customer.objects.filter(C_TYPE="Regular"))
+        self.assertGreater(estimate, 0)
+
+    def test_estimated_count_above_threshold(self):
+        queryset = Customer.objects.order_by("rec_id")
+        with patch.object(EstimatedCountPaginator, "threshold", 10):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 50)
+        self.assertNotIn("COUNT(*)", " ".join(q["sql"] for q in queries))
+
+    def test_exact_count_below_threshold(self):
+        queryset = Customer.objects.order_by("rec_id")
+        with patch.object(EstimatedCountPaginator, "threshold", 1000):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 50)
+        self.assertIn("COUNT(*)", " ".join(q["sql"] for q in queries))
+
+    @patch.object(EstimatedCountPaginator, "threshold", 10)
+    def test_wrong_estimate(self):
+        queryset = Customer.objects.order_by("rec_id")
+        # too low: the pages after the estimate are still served
+        with patch("interview_app.pagination.estimate_count", return_value=15):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            page = paginator.page(3)
+            self.assertEqual(page[0].C_ID, 21)
+            self.assertTrue(page.has_next())
+            page = paginator.page(5)
+            self.assertEqual([c.C_ID for c in page], list(range(41, 51)))
+            self.assertFalse(page.has_next())
+            self.assertEqual(paginator.count, 50)
+        # too high: no empty pages before the estimate runs out
+        with patch("interview_app.pagination.estimate_count", return_value=500):
+            paginator = EstimatedCountPaginator(queryset, 10)
+            self.assertFalse(paginator.page(5).has_next())
+            with self.assertRaises(EmptyPage):
+                paginator.page(6)
+            with self.assertRaises(PageNotAnInteger):
+                paginator.page("x")
+
+
+# region load_data command test
+class LoadDataCommandTests(TestCase):
+    csv_folder = os.path.join(settings.BASE_DIR, "docs", "other_files", "csv")
+
+    def load_data(self, **options):
+        out = StringIO()
+        call_command("load_data", csv_folder=self.csv_folder, stdout=out, **options)
+        return out.getvalue()
+
+    def test_load_data_bulk(self):
+        output = self.load_data(batch_size=50)
+        self.assertIn("rows/sec", output)
+        # the summaries are refreshed after the load
+        self.assertEqual(
+            sum(ShipmentSummary.objects.values_list("shipment_count", flat=True)), 200
+        )
+        self.assertEqual(
+            sum(PaymentSummary.objects.values_list("payment_count", flat=True)), 200
+        )
+        for model in (Employee, Membership, Customer, Shipment, Payment, Status):
+            self.assertEqual(model.objects.count(), 200)
+        self.assertEqual(EmployeeManagesShipment.objects.count(), 200)
+
+        # foreign keys are resolved from the natural keys of the csv files
+        payment = Payment.objects.get(Payment_ID="313cd69e-66f3-11ea-9879-7077813058ce")
+        self.assertEqual(payment.C_ID.C_ID, 230)
+        self.assertEqual(payment.SH_ID.SH_ID, 690)
+        self.assertEqual(payment.Payment_Date, date(2014, 12, 18))
+        self.assertEqual(Status.objects.get(SH_ID=690).Sent_date, date(2014, 4, 28))
+        ems = EmployeeManagesShipment.objects.get(Shipment_Sh_ID__SH_ID=690)
+        self.assertEqual(ems.Employee_E_ID.E_ID, 582)
+        self.assertEqual(ems.Status_Sh_ID.SH_ID, 690)
+
+    def test_load_data_copy(self):
+        output = self.load_data(copy=True)
+        self.assertIn("Copying payments...", output)
+        for model in (Employee, Membership, Customer, Shipment, Payment, Status):
+            self.assertEqual(model.objects.count(), 200)
+        self.assertEqual(EmployeeManagesShipment.objects.count(), 200)
+
+        payment = Payment.objects.get(Payment_ID="313cd69e-66f3-11ea-9879-7077813058ce")
+        self.assertEqual(payment.C_ID.C_ID, 230)
+        self.assertEqual(payment.SH_ID.SH_ID, 690)
+        self.assertEqual(payment.Payment_Date, date(2014, 12, 18))
+        status_obj = Status.objects.get(SH_ID=690)
+        self.assertEqual(status_obj.Sent_date, date(2014, 4, 28))
+        self.assertEqual(status_obj.Delivery_date, date(2014, 12, 18))
+        ems = EmployeeManagesShipment.objects.get(Shipment_Sh_ID__SH_ID=690)
+        self.assertEqual(ems.Employee_E_ID.E_ID, 582)
+        self.assertEqual(ems.Status_Sh_ID.SH_ID, 690)
+
+    def test_load_data_copy_invalid_dates(self):
+        with tempfile.TemporaryDirectory() as folder:
+            shutil.copytree(self.csv_folder, folder, dirs_exist_ok=True)
+            path = os.path.join(folder, "Status.csv")
+            with open(path) as file:
+                content = file.read()
+            with open(path, "w") as file:
+                file.write(
+                    content.replace(
+                        "690,DELIVERED,4/28/2014,12/18/2014",
+                        "690,DELIVERED,2/30/2014,unknown",
+                    )
+                )
+            call_command("load_data", csv_folder=folder, copy=True, stdout=StringIO())
+        # stored as NULL like the ORM path, instead of failing the whole file
+        self.assertEqual(Status.objects.count(), 200)
+        status_obj = Status.objects.get(SH_ID=690)
+        self.assertIsNone(status_obj.Sent_date)
+        self.assertIsNone(status_obj.Delivery_date)
+        self.assertEqual(Status.objects.get(SH_ID=933).Sent_date, date(1997, 6, 14))
+
+    def test_load_data_incremental(self):
+        self.load_data()
+        Customer.objects.filter(C_ID=230).update(C_NAME="Old Name")
+        Payment.objects.filter(
+            Payment_ID="313cd69e-66f3-11ea-9879-7077813058ce"
+        ).delete()
+        Status.objects.filter(SH_ID=690).update(Current_Status="NOT DELIVERED")
+
+        # a full rebuild would fail on the unique natural keys
+        output = self.load_data(incremental=True)
+        self.assertIn("0 inserted, 1 updated, 199 unchanged", output)  # customers
+        self.assertIn("1 inserted, 0 updated, 199 unchanged", output)  # payments
+        self.assertIn("0 inserted, 0 updated, 200 unchanged", output)  # employees
+        self.assertEqual(Customer.objects.get(C_ID=230).C_NAME, "Mitchell")
+        self.assertEqual(Status.objects.get(SH_ID=690).Current_Status, "DELIVERED")
+        self.assertEqual(Customer.objects.count(), 200)
+        self.assertEqual(Payment.objects.count(), 200)
+        self.assertEqual(EmployeeManagesShipment.objects.count(), 200)
+
+    def test_load_data_incremental_composite_key(self):
+        self.load_data()
+        with tempfile.TemporaryDirectory() as folder:
+            shutil.copytree(self.csv_folder, folder, dirs_exist_ok=True)
+            # 582 manages 690 twice in the chunk, the last row wins
+            with open(os.path.join(folder, "employee_manages_shipment.csv"), "a") as f:
+                f.write("582,690,933\n")
+            with CaptureQueriesContext(connection) as queries:
+                output = StringIO()
+                call_command(
+                    "load_data", csv_folder=folder, incremental=True, stdout=output
+                )
+        self.assertIn(
+            "0 inserted, 1 updated, 199 unchanged, 1 duplicate", output.getvalue()
+        )
+        ems = EmployeeManagesShipment.objects.get(Shipment_Sh_ID__SH_ID=690)
+        self.assertEqual(ems.Status_Sh_ID.SH_ID, 933)
+        self.assertEqual(EmployeeManagesShipment.objects.count(), 200)
+        # the existing rows are looked up on both key fields
+        (lookup,) = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and EmployeeManagesShipment._meta.db_table in query["sql"].split("WHERE")[0]
+        ]
+        self.assertIn('"Employee_E_ID_id" IN', lookup)
+        self.assertIn('"Shipment_Sh_ID_id" IN', lookup)
+
+    def test_load_data_resume(self):
+        original_read_chunks = load_data.read_chunks
+
+        def crashing_read_chunks(path, batch_size, offset=0):
+            for index, chunk in enumerate(
+                original_read_chunks(path, batch_size, offset)
+            ):
+                if path.endswith("Payment_Details.csv") and index == 2:
+                    raise RuntimeError("crash")
+                yield chunk
+
+        with patch.object(load_data, "read_chunks", crashing_read_chunks):
+            with self.assertRaises(RuntimeError):
+                self.load_data(batch_size=50)
+        # the first two chunks are committed
+        self.assertEqual(Payment.objects.count(), 100)
+
+        output = self.load_data(batch_size=50)
+        self.assertIn("Skipping customers, already loaded", output)
+        self.assertIn("Resuming payments from row 100", output)
+        self.assertEqual(Payment.objects.count(), 200)
+        self.assertEqual(Payment.objects.values("Payment_ID").distinct().count(), 200)
+        self.assertEqual(EmployeeManagesShipment.objects.count(), 200)
+
+        # --restart ignores the completed checkpoints
+        Payment.objects.all().delete()
+        output = self.load_data(batch_size=50, restart=True, incremental=True)
+        self.assertIn("Loading payments...", output)
+        self.assertEqual(Payment.objects.count(), 200)
+
+    def test_load_data_query_count(self):
+        # queries scale with the number of chunks, not with the number of rows
+        batch_size, rows = 100, 200  # rows per csv file
+        chunks = len(TABLES) * math.ceil(rows / batch_size)
+        expected = (
+            # savepoint, insert, checkpoint update, release
+            4 * chunks
+            # checkpoint lookup, checkpoint insert (savepoint, insert, release),
+            # completed update
+            + 5 * len(TABLES)
+            # a natural key -> rec_id map per foreign key column
+            + sum(len(table.references) for table in TABLES)
+            + len(SUMMARY_MODELS)  # REFRESH MATERIALIZED VIEW
+        )
+        with self.assertNumQueries(expected):
+            self.load_data(batch_size=batch_size)
+
+    def test_load_data_invalid_batch_size(self):
+        with self.assertRaises(CommandError):
+            self.load_data(batch_size=0)
+
+
+class ParallelLoadDataCommandTests(TransactionTestCase):
+    csv_folder = LoadDataCommandTests.csv_folder
+
+    def test_dependency_graph(self):
+        graph = dependency_graph(TABLES)
+        self.assertEqual(graph["employees"], set())
+        self.assertEqual(graph["memberships"], set())
+        self.assertEqual(graph["statuses"], set())
+        self.assertEqual(graph["customers"], {"memberships"})
+        self.assertEqual(graph["shipments"], {"customers"})
+        self.assertEqual(graph["payments"], {"customers", "shipments"})
+        self.assertEqual(
+            graph["employee manages shipments"],
+            {"employees", "shipments", "statuses"},
+        )
+
+    def test_load_data_parallel(self):
+        out = StringIO()
+        call_command("load_data", csv_folder=self.csv_folder, workers=3, stdout=out)
+        self.assertIn("Data loaded successfully!", out.getvalue())
+        self.assertEqual(Payment.objects.count(), 200)
+        self.assertEqual(EmployeeManagesShipment.objects.count(), 200)
+        ems = EmployeeManagesShipment.objects.get(Shipment_Sh_ID__SH_ID=690)
+        self.assertEqual(ems.Employee_E_ID.E_ID, 582)
+
+
+# endregion
@@ -1,5 +1,6 @@
-from django.urls import path
+from django.urls import path, re_path
 from .views import *
+from .async_views import AsyncReadView
 
 urlpatterns = [
     path("employees/", EmployeeListCreateView.as_view(), name="employee-list"),
@@ -75,3 +76,56 @@ urlpatterns = [
         name="shipments-customer-detail",
     ),
 ]
+
+# async (ASGI) variants of the read endpoints, e.g. /api/async/customers/<id>/shipments/
+urlpatterns += [
+    path(
+        f"async/{pattern.pattern}",
+        AsyncReadView.as_view(view_class=pattern.callback.view_class),
+        name=f"async-{pattern.name}",
+    )
+    for pattern in urlpatterns
+]
+
+# streamed NDJSON/CSV dumps of the list endpoints, e.g. /api/shipments/export/?format=csv
+# (first, "payments/<str:pk>/" would match "payments/export/")
+urlpatterns = [
+    path(
+        f"{prefix}/export/",
+        ExportView.as_view(view_class=view_class),
+        name=f"{name}-export",
+    )
+    for prefix, name, view_class in [
+        ("employees", "employee", EmployeeListCreateView),
+        ("memberships", "membership", MembershipListCreateView),
+        ("customers", "customer", CustomerListCreateView),
+        ("shipments", "shipment", ShipmentListCreateView),
+        ("payments", "payment", PaymentListCreateView),
+        ("statuses", "status", StatusListCreateView),
+        (
+            "employeemanagesshipments",
+            "employeemanagesshipment",
+            EmployeeManagesShipmentListCreateView,
+        ),
+    ]
+] + urlpatterns
+
+# analytics: pre-aggregated summaries and columnar dumps, e.g.
+# /api/analytics/shipments/summary/, /api/analytics/shipments.parquet
+urlpatterns += [
+    path(
+        "analytics/shipments/summary/",
+        ShipmentSummaryListView.as_view(),
+        name="shipment-summary",
+    ),
+    path(
+        "analytics/payments/monthly/",
+        PaymentSummaryListView.as_view(),
+        name="payment-summary",
+    ),
+    re_path(
+        r"^analytics/(?P<table>\w+)\.(?P<file_format>[\w.]+)$",
+        ColumnarExportView.as_view(),
+        name="columnar-export",
+    ),
+]
@@ -2,12 +2,23 @@ from django.shortcuts import get_object_or_404
 from rest_framework import generics, filters, status
 from .models import *
 from .serializers import *
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from .cache import cache_response
+from .columnar import COLUMNAR_MODELS, CONTENT_TYPES, get_formats, stream_table
+from .filters import FullTextSearchFilter
+from .renderers import CSVRenderer, NDJSONRenderer, get_columns
 from django.conf import settings
 import logging
-from rest_framework.exceptions import APIException
-from django.db import IntegrityError, DatabaseError
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.views import APIView
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.response import Response
+from django.db import IntegrityError, DatabaseError, transaction
+from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from itertools import islice
+from django.db.models import Prefetch
 
 # Create your views here.
 logger = logging.getLogger(__name__)
@@ -52,8 +63,48 @@ def handle_exceptions(func):
     return wrapper
 
 
+class RelatedQuerysetMixin:
+    """
+    Adds the select_related/prefetch_related paths of the serializer tree to the queryset,
+    so nested serializers do not run a query per row.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        select_related, prefetch_related = get_related_paths(
+            self.get_serializer_class()
+        )
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+class ValuesListMixin:
+    """
+    Lists through the values plan of the serializer: the rows are read with .values()
+    and turned into the serializer representation directly, without model instances.
+    The JSON is the same, serializers without a plan are used as they are.
+    """
+
+    def list(self, request, *args, **kwargs):
+        plan = get_values_plan(self.get_serializer_class())
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # annotations (e.g. the search rank) stay available to the pagination
+        rows = queryset.values(*plan.paths, *queryset.query.annotation_select)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.represent(page))
+        return Response(plan.represent(rows))
+
+
 # Employee
-class EmployeeListCreateView(generics.ListCreateAPIView):
+class EmployeeListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating Employee objects.
     """
@@ -63,20 +114,25 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
     # Use the EmployeeSerializer for serialization
     serializer_class = EmployeeSerializer
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions  # Handles all exceptions
     def dispatch(self, *args, **kwargs):
         """Dispatches requests to the appropriate handler."""
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS, local=True)
+    def get(self, request, *args, **kwargs):
+        """Handles GET requests and provides caching for the list."""
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         """Handles POST request for Employee creation"""
         return super().create(request, *args, **kwargs)
 
 
-class EmployeeRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeRetrieveUpdateDestroyView(
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View for retrieving, updating, and deleting a single Employee object.
     """
@@ -84,7 +140,7 @@ class EmployeeRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         """Handles GET requests and provides caching for a single Employee."""
@@ -107,7 +163,9 @@ class EmployeeRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Membership
-class MembershipListCreateView(generics.ListCreateAPIView):
+class MembershipListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating Membership objects.
     """
@@ -115,18 +173,22 @@ class MembershipListCreateView(generics.ListCreateAPIView):
     queryset = Membership.objects.all()
     serializer_class = MembershipSerializer
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
 
-class MembershipRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class MembershipRetrieveUpdateDestroyView(
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View for retrieving, updating, and deleting a single Membership object.
     """
@@ -134,7 +196,7 @@ class MembershipRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
     queryset = Membership.objects.all()
     serializer_class = MembershipSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -153,28 +215,36 @@ class MembershipRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
 
 
 # Customer
-class CustomerListCreateView(generics.ListCreateAPIView):
+class CustomerListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating Customer objects.
     """
 
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
-    filter_backends = [filters.SearchFilter]
+    # ranked search on name, email and address, substring matches on the name
+    filter_backends = [FullTextSearchFilter]
+    search_vector = CUSTOMER_SEARCH_VECTOR
     search_fields = ["C_NAME"]
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
 
-class CustomerRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class CustomerRetrieveUpdateDestroyView(
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View for retrieving, updating, and deleting a single Customer object.
     """
@@ -182,7 +252,7 @@ class CustomerRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -201,7 +271,9 @@ class CustomerRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Shipment
-class ShipmentListCreateView(generics.ListCreateAPIView):
+class ShipmentListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating Shipment objects.
     """
@@ -211,18 +283,22 @@ class ShipmentListCreateView(generics.ListCreateAPIView):
     filter_backends = [filters.OrderingFilter]  # Enable ordering filter
     ordering_fields = ["SH_CHARGES"]  # Specifies the field for ordering
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
 
-class ShipmentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class ShipmentRetrieveUpdateDestroyView(
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View for retrieving, updating, and deleting a single Shipment object.
     """
@@ -230,7 +306,7 @@ class ShipmentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Shipment.objects.all()
     serializer_class = ShipmentSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -249,7 +325,9 @@ class ShipmentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Payment
-class PaymentListCreateView(generics.ListCreateAPIView):
+class PaymentListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating Payment objects.
     """
@@ -257,18 +335,22 @@ class PaymentListCreateView(generics.ListCreateAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
 
-class PaymentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class PaymentRetrieveUpdateDestroyView(
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View for retrieving, updating, and deleting a single Payment object.
     """
@@ -276,7 +358,7 @@ class PaymentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -295,7 +377,9 @@ class PaymentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Status
-class StatusListCreateView(generics.ListCreateAPIView):
+class StatusListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating Status objects.
     """
@@ -303,18 +387,22 @@ class StatusListCreateView(generics.ListCreateAPIView):
     queryset = Status.objects.all()
     serializer_class = StatusSerializer
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
 
-class StatusRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class StatusRetrieveUpdateDestroyView(
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View for retrieving, updating, and deleting a single Status object.
     """
@@ -322,7 +410,7 @@ class StatusRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Status.objects.all()
     serializer_class = StatusSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -341,7 +429,9 @@ class StatusRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # EmployeeManagesShipment - EMS
-class EmployeeManagesShipmentListCreateView(generics.ListCreateAPIView):
+class EmployeeManagesShipmentListCreateView(
+    ValuesListMixin, RelatedQuerysetMixin, generics.ListCreateAPIView
+):
     """
     View for listing and creating EmployeeManagesShipment objects.
     """
@@ -349,19 +439,21 @@ class EmployeeManagesShipmentListCreateView(generics.ListCreateAPIView):
     queryset = EmployeeManagesShipment.objects.all()
     serializer_class = EmployeeManagesShipmentSerializer
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     @handle_exceptions
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
 
 class EmployeeManagesShipmentRetrieveUpdateDestroyView(
-    generics.RetrieveUpdateDestroyAPIView
+    RelatedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
 ):
     """
     View for retrieving, updating, and deleting a single EmployeeManagesShipment object.
@@ -370,7 +462,7 @@ class EmployeeManagesShipmentRetrieveUpdateDestroyView(
     queryset = EmployeeManagesShipment.objects.all()
     serializer_class = EmployeeManagesShipmentSerializer
 
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
+    @cache_response(settings.CACHE_TTL_SECONDS)
     @handle_exceptions
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -389,44 +481,68 @@ class EmployeeManagesShipmentRetrieveUpdateDestroyView(
 
 
 # region CUSTOM END POINTS
+def shipments_with_status(current_status):
+    """
+    Returns the shipments with the given status. The related EmployeeManagesShipment rows
+    and their Status are prefetched in a single query, ordered like .first() would.
+    """
+    return Shipment.objects.filter(
+        employeemanagesshipment__Status_Sh_ID__Current_Status=current_status
+    ).prefetch_related(
+        Prefetch(
+            "employeemanagesshipment_set",
+            queryset=EmployeeManagesShipment.objects.select_related(
+                "Status_Sh_ID"
+            ).order_by("rec_id"),
+            to_attr="ems_list",
+        )
+    )
+
+
 # customer>shipment
-class CustomerShipmentDetailsView(generics.RetrieveAPIView):
+class CustomerShipmentDetailsView(RelatedQuerysetMixin, generics.RetrieveAPIView):
     """
     View for retrieving customer details along with their associated shipments.
     """
 
+    queryset = Customer.objects.all()
     serializer_class = CustomerShipmentSerializer
 
     @handle_exceptions
     def get_object(self):
         rec_id = self.kwargs.get("rec_id")
-        return get_object_or_404(Customer, rec_id=rec_id)
+        return get_object_or_404(self.get_queryset(), rec_id=rec_id)
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
-class EMSStatusDeailView(generics.RetrieveAPIView):
+class EMSStatusDeailView(RelatedQuerysetMixin, generics.RetrieveAPIView):
     """
     View for retrieving EmployeeManagesShipment details with Status details.
     """
 
+    queryset = EmployeeManagesShipment.objects.all()
     serializer_class = EMSStatusSerializer
 
     @handle_exceptions
     def get_object(self):
         rec_id = self.kwargs.get("rec_id")
-        return get_object_or_404(EmployeeManagesShipment, rec_id=rec_id)
+        return get_object_or_404(self.get_queryset(), rec_id=rec_id)
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class DeliveredShipmentListView(generics.ListAPIView):
     """
@@ -434,19 +550,21 @@ class DeliveredShipmentListView(generics.ListAPIView):
     """
 
     serializer_class = DeliveredShipmentSerializer
+    # the status comes from these models, not from the serializer tree
+    cache_models = (EmployeeManagesShipment, Status)
 
     @handle_exceptions
     def get_queryset(self):
-        return Shipment.objects.filter(
-            employeemanagesshipment__Status_Sh_ID__Current_Status="DELIVERED"
-        ).prefetch_related("employeemanagesshipment_set__Status_Sh_ID")
+        return shipments_with_status("DELIVERED")
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS, local=True)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class NotDeliveredShipmentListView(generics.ListAPIView):
     """
@@ -454,37 +572,217 @@ class NotDeliveredShipmentListView(generics.ListAPIView):
     """
 
     serializer_class = DeliveredShipmentSerializer
+    # the status comes from these models, not from the serializer tree
+    cache_models = (EmployeeManagesShipment, Status)
 
     @handle_exceptions
     def get_queryset(self):
-        return Shipment.objects.filter(
-            employeemanagesshipment__Status_Sh_ID__Current_Status="NOT DELIVERED"
-        ).prefetch_related("employeemanagesshipment_set__Status_Sh_ID")
+        return shipments_with_status("NOT DELIVERED")
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS, local=True)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
-class ShipmentCustomerDetailView(generics.RetrieveAPIView):
+class ShipmentCustomerDetailView(RelatedQuerysetMixin, generics.RetrieveAPIView):
     """
     View for retrieving shipment details along with their associated customer.
     """
 
+    queryset = Shipment.objects.all()
     serializer_class = ShipmentCustomerSerializer
 
     @handle_exceptions
     def get_object(self):
         rec_id = self.kwargs.get("rec_id")
-        return get_object_or_404(Shipment, rec_id=rec_id)
+        return get_object_or_404(self.get_queryset(), rec_id=rec_id)
+
+    @handle_exceptions
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    @cache_response(settings.CACHE_TTL_SECONDS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+# endregion
+
+
+# region EXPORT END POINTS
+async def aiterate(iterator):
+    """
+    Async iterator over a sync one. The items are read one at a time in the thread of
+    the request, so a generator keeps its database connection and transaction.
+    """
+    read = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while (item := await read(iterator, done)) is not done:
+            yield item
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def streaming_response(request, chunks, content_type):
+    """
+    StreamingHttpResponse of a generator of chunks. Under ASGI Django collects a sync
+    iterator into a list before sending it, it gets an async iterator there instead,
+    so a single chunk is in memory at a time.
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = aiterate(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+class ExportView(generics.GenericAPIView):
+    """
+    Streams every row of a list endpoint as NDJSON (default) or CSV ("?format=csv" or
+    "Accept: text/csv"), e.g. /api/shipments/export/?format=csv&ordering=SH_CHARGES.
+    The queryset, filters and serializer come from view_class. Rows are read from a
+    server-side cursor and rendered chunk_size rows at a time, so memory does not grow
+    with the table.
+    """
+
+    view_class = None
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    pagination_class = None
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+
+    def get_serializer_class(self):
+        return self.view_class.serializer_class
+
+    @handle_exceptions
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        view = self.view_class(
+            request=request, args=args, kwargs=kwargs, format_kwarg=None
+        )
+        queryset = view.filter_queryset(view.get_queryset())
+        # the database is chosen now, while ReplicaMiddleware allows the replicas
+        queryset = queryset.using(queryset.db)
+        serializer = view.get_serializer()
+        renderer = request.accepted_renderer
+        response = streaming_response(
+            request._request,
+            self.stream(renderer, queryset, serializer),
+            f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        filename = f"{queryset.model._meta.model_name}s.{renderer.format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def stream(self, renderer, queryset, serializer):
+        columns = get_columns(serializer)
+        yield renderer.render_header(columns)
+        # in a transaction the cursor is not WITH HOLD, so the database does not
+        # materialize the whole result either
+        with transaction.atomic(using=queryset.db):
+            plan = get_values_plan(type(serializer))
+            if plan is None:
+                objects = queryset.iterator(chunk_size=self.chunk_size)
+                rows = (serializer.to_representation(obj) for obj in objects)
+            else:
+                values = queryset.values(*plan.paths).iterator(
+                    chunk_size=self.chunk_size
+                )
+                rows = (plan.build(plan.steps, row) for row in values)
+            while chunk := list(islice(rows, self.chunk_size)):
+                yield renderer.render_rows(chunk, columns)
+
+
+class ColumnarExportView(APIView):
+    """
+    Streams a whole table for analytics as Parquet or gzip compressed csv, e.g.
+    /api/analytics/shipments.parquet, /api/analytics/payments.csv.gz
+    (see the export_data command).
+    """
+
+    @handle_exceptions
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    @extend_schema(
+        responses={
+            (200, content_type): OpenApiTypes.BINARY
+            for content_type in CONTENT_TYPES.values()
+        }
+    )
+    def get(self, request, table, file_format):
+        if table not in COLUMNAR_MODELS or file_format not in get_formats():
+            raise NotFound(
+                f"Available tables: {', '.join(COLUMNAR_MODELS)}, "
+                f"formats: {', '.join(get_formats())}"
+            )
+        queryset = COLUMNAR_MODELS[table].objects.all()
+        # the database is chosen now, while ReplicaMiddleware allows the replicas
+        queryset = queryset.using(queryset.db)
+        response = streaming_response(
+            request._request,
+            stream_table(queryset, file_format, settings.EXPORT_CHUNK_SIZE),
+            CONTENT_TYPES[file_format],
+        )
+        filename = f"{table}.{file_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+# endregion
+
+
+# region ANALYTICS END POINTS
+class ShipmentSummaryListView(ValuesListMixin, generics.ListAPIView):
+    """
+    View for listing the shipment count and charges per domain and service type, e.g.
+    /api/analytics/shipments/summary/?ordering=-total_charges. The rows come from a
+    materialized view, as of its last refresh (see refresh_summaries).
+    """
+
+    queryset = ShipmentSummary.objects.order_by("SH_DOMAIN", "SER_TYPE")
+    serializer_class = ShipmentSummarySerializer
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["shipment_count", "total_charges", "average_charges"]
+    # a row per group, a single page
+    pagination_class = None
 
-    # To make the cache middleware catch dispatch methods instead of get methods, we are ading method_decorator here.
-    @method_decorator(cache_page(settings.CACHE_TTL_SECONDS))
     @handle_exceptions
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
+    @cache_response(settings.CACHE_TTL_SECONDS, local=True)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class PaymentSummaryListView(ValuesListMixin, generics.ListAPIView):
+    """
+    View for listing the payment count and amount per month, payment mode and payment
+    status, e.g. /api/analytics/payments/monthly/?ordering=-month. The rows come from a
+    materialized view, as of its last refresh (see refresh_summaries).
+    """
+
+    queryset = PaymentSummary.objects.order_by(
+        "month", "Payment_Mode", "Payment_Status"
+    )
+    serializer_class = PaymentSummarySerializer
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["month", "payment_count", "total_amount"]
+    # a row per group, a single page
+    pagination_class = None
+
+    @handle_exceptions
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    @cache_response(settings.CACHE_TTL_SECONDS, local=True)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 # endregion